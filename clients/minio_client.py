@@ -1,15 +1,32 @@
 from minio import Minio
+from minio.error import S3Error
 from dotenv import load_dotenv
 import os
+import io
 import logging
 from werkzeug.utils import secure_filename
 import uuid
-import tempfile
+from contextlib import contextmanager
+from datetime import timedelta
+from services.cache_service import BytesLRUCache
 
 load_dotenv()
 MINIO_ROOT_USER = os.getenv('MINIO_ROOT_USER')
 MINIO_ROOT_PASSWORD = os.getenv('MINIO_ROOT_PASSWORD')
 MINIO_ENDPOINT = os.getenv('MINIO_ENDPOINT', 'localhost:9000')
+PDF_CACHE_MAX_BYTES = int(os.getenv('PDF_CACHE_MAX_BYTES', str(128 * 1024 * 1024)))
+# "stream": PDFs go through the app, "presigned": browsers download them straight from MinIO,
+# which needs MinIO to be reachable from the browser (see MINIO_PUBLIC_ENDPOINT)
+MINIO_DOWNLOAD_MODE = os.getenv('MINIO_DOWNLOAD_MODE', 'stream')
+# Host the browser uses to reach MinIO, when it differs from MINIO_ENDPOINT (presigned URLs are signed for one host)
+MINIO_PUBLIC_ENDPOINT = os.getenv('MINIO_PUBLIC_ENDPOINT')
+MINIO_REGION = os.getenv('MINIO_REGION', 'us-east-1')
+MINIO_PRESIGNED_EXPIRY_MINUTES = int(os.getenv('MINIO_PRESIGNED_EXPIRY_MINUTES', '15'))
+# Uploads larger than one part are sent as a multipart upload (MinIO minimum part size is 5 MiB)
+MINIO_PART_SIZE = int(os.getenv('MINIO_PART_SIZE', str(10 * 1024 * 1024)))
+
+# Shared by every MinioClientService in the process so repeat previews skip MinIO
+_file_bytes_cache = BytesLRUCache(max_bytes=PDF_CACHE_MAX_BYTES)
 
 
 logging.basicConfig(
@@ -28,6 +45,15 @@ class MinioClientService:
             secret_key=MINIO_ROOT_PASSWORD,
             secure=False
         )
+        self.presigned_downloads = MINIO_DOWNLOAD_MODE == "presigned"
+        # Signing is local; a fixed region avoids a bucket-location request per URL
+        self.signer = Minio(
+            MINIO_PUBLIC_ENDPOINT or MINIO_ENDPOINT,
+            access_key=MINIO_ROOT_USER,
+            secret_key=MINIO_ROOT_PASSWORD,
+            secure=False,
+            region=MINIO_REGION
+        )
         self._ensure_bucket()
 
     def _ensure_bucket(self):
@@ -37,21 +63,75 @@ class MinioClientService:
         else:
             logger.info(f"Bucket {self.bucket_name} already exists")
 
-    def upload_file(self, uploaded_file):
-        """Uploads a file and returns the object name."""
-        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp_file:
-            tmp_file.write(uploaded_file.read())
-            tmp_path = tmp_file.name
+    def upload_bytes(self, data, object_name, content_type="application/pdf"):
+        """Streams an in-memory buffer to MinIO with a known length and returns the object name."""
+        self.client.put_object(
+            self.bucket_name,
+            object_name,
+            io.BytesIO(data),
+            length=len(data),
+            part_size=MINIO_PART_SIZE,
+            content_type=content_type,
+        )
+        logger.info(f"Uploaded {object_name} ({len(data)} bytes) to bucket {self.bucket_name}")
+        return object_name
+
+    def upload_file(self, uploaded_file, object_name=None):
+        """Uploads a file object without writing it to disk and returns the object name."""
+        data = uploaded_file.getvalue() if hasattr(uploaded_file, "getvalue") else uploaded_file.read()
+        secure_file_name = secure_filename(object_name or f"{uploaded_file.name}_{uuid.uuid4()}.pdf")
+        return self.upload_bytes(data, secure_file_name)
 
-        secure_file_name = secure_filename(f"{uploaded_file.name}_{uuid.uuid4()}.pdf")
-        self.client.fput_object(self.bucket_name, secure_file_name, tmp_path)
-        logger.info(f"Uploaded {secure_file_name} to bucket {self.bucket_name}")
-        return secure_file_name
+    def object_exists(self, object_name):
+        try:
+            self.client.stat_object(self.bucket_name, object_name)
+            return True
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                return False
+            raise
 
     def download_file(self, object_name):
+        """Returns the raw response; the caller must close() it and release_conn(). Prefer open_file."""
         logger.info(f"Downloaded {object_name}")
         return self.client.get_object(self.bucket_name, object_name)
 
+    @contextmanager
+    def open_file(self, object_name):
+        """Streams an object; its pooled connection is released when the block exits."""
+        response = self.client.get_object(self.bucket_name, object_name)
+        try:
+            yield response
+        finally:
+            response.close()
+            response.release_conn()
+
+    def get_presigned_url(self, object_name, download_name=None, expires=None):
+        """Time-limited GET URL so the browser fetches the object from MinIO directly."""
+        response_headers = None
+        if download_name:
+            response_headers = {
+                "response-content-disposition": f'attachment; filename="{secure_filename(download_name)}"'
+            }
+        return self.signer.presigned_get_object(
+            self.bucket_name,
+            object_name,
+            expires=expires or timedelta(minutes=MINIO_PRESIGNED_EXPIRY_MINUTES),
+            response_headers=response_headers,
+        )
+
+    def get_file_bytes(self, object_name):
+        """Returns the object's content, served from the in-process cache when possible."""
+        cache_key = f"{self.bucket_name}/{object_name}"
+        data = _file_bytes_cache.get(cache_key)
+        if data is not None:
+            return data
+        with self.open_file(object_name) as response:
+            data = response.read()
+        _file_bytes_cache.set(cache_key, data)
+        logger.info(f"Downloaded {object_name} ({len(data)} bytes)")
+        return data
+
     def delete_file(self, object_name):
         self.client.remove_object(self.bucket_name, object_name)
         logger.info(f"Deleted {object_name} from bucket {self.bucket_name}")
@@ -2,7 +2,9 @@ import os
 import dotenv
 from pymongo.mongo_client import MongoClient
 from pymongo.server_api import ServerApi
+import re
 import logging
+from datetime import datetime, time, timedelta
 from pymongo.errors import PyMongoError
 
 logging.basicConfig(
@@ -51,6 +53,110 @@ def check_mongo_duplicate(email="", full_name=""):
     result = collection_candidat.find_one(query)
     return result is not None
 
+def find_resume_duplicate(content_hash=None, text_hash=None):
+    """Return the candidate already stored with the same file bytes or the same normalized text, if any."""
+    conditions = []
+    if content_hash:
+        conditions.append({"content_hash": content_hash})
+    if text_hash:
+        conditions.append({"text_hash": text_hash})
+    if not conditions:
+        return None
+    return collection_candidat.find_one(
+        {"$or": conditions},
+        {"full_name": 1, "email": 1, "minio_file_name": 1, "job_offer": 1, "job_offer_date": 1,
+         "content_hash": 1, "text_hash": 1},
+    )
+
+
+def merge_duplicate_resume(candidate_id, job_offer="", job_offer_date=None):
+    """Attach a re-uploaded resume to the existing candidate instead of storing it again."""
+    update = {"$inc": {"duplicate_uploads": 1}}
+    fields = {}
+    if job_offer:
+        fields["job_offer"] = job_offer
+    if job_offer_date:
+        fields["job_offer_date"] = job_offer_date
+    if fields:
+        update["$set"] = fields
+    collection_candidat.update_one({"_id": candidate_id}, update)
+    logger.info(f"Merged duplicate upload into candidate {candidate_id}")
+
+
+def migrate_job_offer_dates():
+    """Convert job_offer_date values stored as ISO strings into BSON dates so they can be range-queried (idempotent)."""
+    result = collection_candidat.update_many(
+        {"job_offer_date": {"$type": "string"}},
+        [{"$set": {"job_offer_date": {"$dateFromString": {"dateString": "$job_offer_date", "onError": "$job_offer_date"}}}}],
+    )
+    if result.modified_count:
+        logger.info(f"Converted job_offer_date to a date on {result.modified_count} candidates")
+
+
+def job_offer_filter(job_offer=None, start_date=None, end_date=None):
+    """Mongo filter for a job offer and an inclusive job offer date range."""
+    if not job_offer:
+        return {}
+    query = {"job_offer": job_offer}
+    if start_date and end_date:
+        query["job_offer_date"] = {
+            "$gte": datetime.combine(start_date, time.min),
+            "$lt": datetime.combine(end_date + timedelta(days=1), time.min),
+        }
+    return query
+
+
+def build_candidate_filter(name="", role="", email="", summary="", skills=None, skill_match_mode="Any",
+                           job_offer=None, start_date=None, end_date=None):
+    """Translate the Resume Library filters into one MongoDB query ("contains" filters are case-insensitive)."""
+    conditions = []
+    for field, value in (
+        ("full_name", name),
+        ("current_role_experience.role", role),
+        ("email", email),
+        ("summary", summary),
+    ):
+        if value:
+            conditions.append({field: {"$regex": re.escape(value), "$options": "i"}})
+    if skills:
+        # Skills outside the dictionary keep the case the resume used ("Python"), so match whole values case-insensitively
+        skill_patterns = [re.compile("^" + re.escape(s.strip()) + "$", re.IGNORECASE) for s in skills]
+        operator = "$all" if skill_match_mode == "All" else "$in"
+        conditions.append({"skills.technology": {operator: skill_patterns}})
+    offer_filter = job_offer_filter(job_offer, start_date, end_date)
+    if offer_filter:
+        conditions.append(offer_filter)
+
+    if not conditions:
+        return {}
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+
+def find_candidates_page(query, projection=None, page_size=10, after_id=None):
+    """
+    One page of candidates in _id order, starting after ``after_id``.
+    Returns (documents, has_next_page).
+    """
+    if after_id is not None:
+        query = {"$and": [query, {"_id": {"$gt": after_id}}]} if query else {"_id": {"$gt": after_id}}
+    documents = list(
+        collection_candidat.find(query, projection).sort("_id", 1).limit(page_size + 1)
+    )
+    return documents[:page_size], len(documents) > page_size
+
+
+def get_job_offer_counts():
+    """Number of candidates per job offer, most popular first."""
+    pipeline = [
+        {"$match": {"job_offer": {"$exists": True, "$ne": ""}}},
+        {"$group": {"_id": "$job_offer", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+    ]
+    return {doc["_id"]: doc["count"] for doc in collection_candidat.aggregate(pipeline)}
+
+
 def get_skills_statistics():
     pipeline = [
     {
@@ -115,15 +221,23 @@ def get_skills_mongo():
     return list(result["technologies"])
 
 def remove_skills_mongo(tech_list: list[str], doc_id="tech_stack"):
-    for tech_name in tech_list:
-        result = collection_skills.update_one(
-            {"_id": doc_id},
-            {"$pull": {"technologies": tech_name.lower()}}
-        )
-        if result.modified_count > 0:
-            logger.info(f"Removed '{tech_name.lower()}' from technologies.")
-        else:
-            logger.info(f"'{tech_name.lower()}' not found in technologies (mongodb).")
+    """Remove all given technologies with a single $pull."""
+    tech_names = list(dict.fromkeys(tech_name.lower() for tech_name in tech_list))
+    if not tech_names:
+        return
+    result = collection_skills.update_one(
+        {"_id": doc_id},
+        {"$pull": {"technologies": {"$in": tech_names}}}
+    )
+    if result.modified_count > 0:
+        logger.info(f"Removed {tech_names} from technologies.")
+    else:
+        logger.info(f"{tech_names} not found in technologies (mongodb).")
+
+
+################# Background ingestion jobs
+
+collection_jobs = _mongo_candidat_init(collection_name="IngestionJobs")
 
 
 def main():
@@ -0,0 +1,107 @@
+import logging
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+from clients.mongo_client import collection_candidat
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(levelname)s] %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# Every index the app relies on for the Candidats collection
+CANDIDATE_INDEXES = [
+    IndexModel([("skills.technology", ASCENDING)], name="skills_technology"),
+    IndexModel([("roles_experience.role", ASCENDING)], name="roles_experience_role"),
+    IndexModel([("job_offer", ASCENDING), ("job_offer_date", DESCENDING)], name="job_offer_date"),
+    IndexModel([("email", ASCENDING)], name="email"),
+    IndexModel([("full_name", ASCENDING)], name="full_name"),
+    IndexModel([("summary", TEXT)], name="summary_text"),
+    # Resume fingerprints, sparse so documents stored before fingerprinting are allowed
+    IndexModel([("content_hash", ASCENDING)], name="content_hash_unique", unique=True, sparse=True),
+    IndexModel([("text_hash", ASCENDING)], name="text_hash_unique", unique=True, sparse=True),
+]
+
+# Job queue: workers claim the oldest due job in an active state
+JOB_INDEXES = [
+    IndexModel([("state", ASCENDING), ("next_attempt_at", ASCENDING)], name="state_next_attempt"),
+]
+
+# Representative queries issued by the pages, used to check which index serves them
+INDEX_USAGE_QUERIES = {
+    "chat skill search": {"skills": {"$elemMatch": {"technology": {"$regex": "^python$", "$options": "i"}, "years_experience": {"$gte": 5}}}},
+    "chat role search": {"roles_experience": {"$elemMatch": {"role": {"$regex": "^data scientist", "$options": "i"}}}},
+    "job offer filter": {"job_offer": "Data Scientist", "job_offer_date": {"$gte": datetime(2024, 1, 1)}},
+    "job offer aggregation": {"job_offer": {"$exists": True, "$ne": ""}},
+    "duplicate check (email / name)": {"$or": [{"email": "jane@example.com"}, {"full_name": "Jane Doe"}]},
+    "duplicate check (fingerprint)": {"$or": [{"content_hash": "0" * 64}, {"text_hash": "0" * 64}]},
+    "summary text search": {"$text": {"$search": "python"}},
+}
+
+
+def ensure_indexes(collection=collection_candidat, indexes=CANDIDATE_INDEXES):
+    """Create every registered index. Safe to call repeatedly: identical existing indexes are left untouched."""
+    for index in indexes:
+        name = index.document["name"]
+        try:
+            collection.create_indexes([index])
+        except OperationFailure as e:
+            # An index with the same name or keys but different options already exists
+            logger.error(f"Could not create index {name}: {e}")
+    logger.info(f"Ensured {len(indexes)} indexes on {collection.name}")
+
+
+def _collect_plan(plan, stages, index_names):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.add(plan["stage"])
+        if "indexName" in plan:
+            index_names.add(plan["indexName"])
+        for key in ("queryPlan", "inputStage", "inputStages"):
+            if key in plan:
+                _collect_plan(plan[key], stages, index_names)
+    elif isinstance(plan, list):
+        for sub_plan in plan:
+            _collect_plan(sub_plan, stages, index_names)
+
+
+def explain_plan(cursor):
+    """Stages and index names of the winning plan MongoDB picks for a cursor."""
+    winning_plan = cursor.explain()["queryPlanner"]["winningPlan"]
+    stages, index_names = set(), set()
+    _collect_plan(winning_plan, stages, index_names)
+    return stages, index_names
+
+
+def index_usage_report(collection=collection_candidat, queries=INDEX_USAGE_QUERIES):
+    """Explain each registered query and report the indexes its winning plan uses."""
+    report = []
+    for name, query in queries.items():
+        try:
+            stages, index_names = explain_plan(collection.find(query))
+        except OperationFailure as e:
+            report.append({"query": name, "indexes": [], "collscan": None, "error": str(e)})
+            continue
+        report.append({
+            "query": name,
+            "indexes": sorted(index_names),
+            "collscan": "COLLSCAN" in stages,
+        })
+    return report
+
+
+if __name__ == "__main__":
+    # python -m clients.mongo_indexes
+    ensure_indexes()
+    for row in index_usage_report():
+        if row.get("error"):
+            status = f"error: {row['error']}"
+        elif row["collscan"]:
+            status = "COLLSCAN"
+        else:
+            status = ", ".join(row["indexes"])
+        print(f"{row['query']:<32} {status}")
@@ -1,8 +1,11 @@
 from langchain_community.vectorstores import Chroma
 from embeddings.google_langchain_chroma_Adapter import FixedGoogleEmbedding
+from embeddings.skill_index import SkillIndex
 from dotenv import load_dotenv
 from chromadb.errors import IDAlreadyExistsError
 import logging
+import threading
+from typing import Optional
 
 logging.basicConfig(
     level=logging.WARNING,
@@ -13,6 +16,7 @@ logger = logging.getLogger(__name__)
 # Load env variables (must include GOOGLE_API_KEY)
 load_dotenv()
 db_location = "./chroma_db"
+SIMILARITY_SCORE_THRESHOLD = 0.9
 
 # Initialize the Custom LangChain-compatible embedding function
 
@@ -29,36 +33,73 @@ vectorstore = Chroma(
 retriever = vectorstore.as_retriever(
     search_type="similarity_score_threshold",
     search_kwargs={
-        "score_threshold": 0.9,
+        "score_threshold": SIMILARITY_SCORE_THRESHOLD,
         "k": 1
     }
 )
 
-def add_unique_skills_to_chroma(skills: list[str]):
-    """Adds skills if they don't already exist."""
-    
-    
-    for skill in skills:
-        result = vectorstore.get(skill)
-        if result["ids"] != []:
-            logger.info(f"⚠️ Document with id {skill} already exists in chroma.")
-        else:
-            vectorstore.add_texts([skill],ids=[skill])
-            logger.info(f"Added {skill} skill to chroma")
+_skill_index = None
+_skill_index_lock = threading.Lock()
+
+def get_skill_index() -> SkillIndex:
+    """In-memory skill index, loaded from Chroma on first use and reloaded if another process changed the collection."""
+    global _skill_index
+    with _skill_index_lock:
+        if _skill_index is None:
+            _skill_index = SkillIndex(vectorstore, vectorstore._select_relevance_score_fn())
+        elif len(_skill_index) != vectorstore._collection.count():
+            _skill_index.reload()
+        return _skill_index
+
+def add_unique_skills_to_chroma(skills: list[str]) -> list[str]:
+    """Adds skills if they don't already exist: one id lookup, one embedding request, one insert. Returns the added skills."""
+    unique_skills = list(dict.fromkeys(skill for skill in skills if skill))
+    if not unique_skills:
+        return []
+
+    existing = set(vectorstore.get(ids=unique_skills, include=[])["ids"])
+    if existing:
+        logger.info(f"⚠️ {len(existing)} skill(s) already exist in chroma: {sorted(existing)}")
+
+    missing = [skill for skill in unique_skills if skill not in existing]
+    if missing:
+        vectorstore.add_texts(missing, ids=missing)
+        logger.info(f"Added {len(missing)} skill(s) to chroma: {missing}")
+        if _skill_index is not None:
+            _skill_index.add(missing)
+    return missing
 
 
 def find_similar_skill(skill: str):
     """Finds a similar skill."""
-    results = retriever.invoke(skill)
-    if results:
-        return results[0].page_content
-    logger.info(f"Didnt find similar for {skill}")
-    return None
+    return find_similar_skills([skill]).get(skill)
+
+
+def find_similar_skills(skills: list[str]) -> dict[str, Optional[str]]:
+    """Finds a similar skill for each input with a single embedding request and one in-memory matrix product."""
+    unique_skills = list(dict.fromkeys(skills))
+    if not unique_skills:
+        return {}
+
+    embeddings = fixed_embeding.embed_documents(unique_skills)
+    matches = get_skill_index().nearest(embeddings, SIMILARITY_SCORE_THRESHOLD)
+
+    mapping: dict[str, Optional[str]] = {}
+    for skill, match in zip(unique_skills, matches):
+        if match is None:
+            logger.info(f"Didnt find similar for {skill}")
+        mapping[skill] = match
+    return mapping
 
 def remove_skills_chroma(ids):
-    ids = [id.strip().lower() for id in ids]
+    """Deletes all given skills in a single call."""
+    ids = list(dict.fromkeys(id.strip().lower() for id in ids))
+    if not ids:
+        return
     vectorstore.delete(ids)
     logger.info(f"deleted the following skills: {ids} in chroma")
+    if _skill_index is not None:
+        _skill_index.remove(ids)
 
 def get_all_skills_chroma():
     """Get all skills from ChromaDB"""
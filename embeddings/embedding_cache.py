@@ -0,0 +1,152 @@
+import os
+import json
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, only one writer process is safe
+    fcntl = None
+
+import numpy as np
+
+from services.cache_service import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding store: float32 vectors in a memory-mapped file,
+    plus a JSON index mapping each key to its row.
+
+    Rows are only ever appended, so a reader never sees a half-written vector
+    that the index already points to. The app, worker.py and import_resumes.py
+    share these files: writers take an exclusive file lock and re-read the index
+    before appending, and readers reload it when a key is missing and another
+    process has written since.
+    """
+
+    def __init__(self, name: str = "embeddings", cache_dir: str = CACHE_DIR, initial_capacity: int = 1024):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.vectors_path = os.path.join(cache_dir, f"{name}.f32")
+        self.index_path = os.path.join(cache_dir, f"{name}.index.json")
+        self.lock_path = os.path.join(cache_dir, f"{name}.lock")
+        self.initial_capacity = initial_capacity
+        self._lock = threading.Lock()
+        self._dim: Optional[int] = None
+        self._rows: dict[str, int] = {}
+        self._vectors: Optional[np.memmap] = None
+        self._signature = None
+        self._load()
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock shared by every process writing to this cache"""
+        with open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _index_signature(self):
+        try:
+            stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> None:
+        """(Re)read the index and map the vectors file at its current size"""
+        signature = self._index_signature()
+        if signature is None:
+            return
+        # The index is replaced atomically, so it never needs a lock to be read
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        self._signature = signature
+        self._dim = index.get("dim")
+        self._rows = index.get("rows", {})
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        if self._dim and os.path.exists(self.vectors_path):
+            self._open_vectors()
+
+    def _open_vectors(self) -> None:
+        capacity = os.path.getsize(self.vectors_path) // (4 * self._dim)
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self._dim))
+
+    def _ensure_capacity(self, rows_needed: int) -> None:
+        capacity = self._vectors.shape[0] if self._vectors is not None else 0
+        if rows_needed <= capacity:
+            return
+        new_capacity = max(self.initial_capacity, capacity * 2, rows_needed)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(new_capacity * 4 * self._dim)
+        self._open_vectors()
+
+    def _write_index(self) -> None:
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dim": self._dim, "rows": self._rows}, f)
+        os.replace(tmp_path, self.index_path)
+        self._signature = self._index_signature()
+
+    def get_many(self, keys: list[str]) -> list[Optional[np.ndarray]]:
+        with self._lock:
+            if any(key not in self._rows for key in keys) and self._index_signature() != self._signature:
+                # Another process may have embedded the missing keys
+                self._load()
+            if self._vectors is None:
+                return [None] * len(keys)
+            return [
+                np.array(self._vectors[self._rows[key]]) if key in self._rows else None
+                for key in keys
+            ]
+
+    def put_many(self, keys: list[str], vectors: list[list[float]]) -> None:
+        if not keys:
+            return
+        array = np.asarray(vectors, dtype=np.float32)
+        with self._lock, self._file_lock():
+            # Rows appended by other processes since the last read must not be overwritten
+            self._load()
+            if self._dim is None:
+                self._dim = array.shape[1]
+            elif array.shape[1] != self._dim:
+                raise ValueError(f"Embedding dimension {array.shape[1]} does not match cache dimension {self._dim}")
+
+            new_keys = [(key, vector) for key, vector in zip(keys, array) if key not in self._rows]
+            if not new_keys:
+                return
+            start = len(self._rows)
+            self._ensure_capacity(start + len(new_keys))
+            for offset, (key, vector) in enumerate(new_keys):
+                self._vectors[start + offset] = vector
+                self._rows[key] = start + offset
+            self._vectors.flush()
+            self._write_index()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = EmbeddingCache()
+        return _shared_cache
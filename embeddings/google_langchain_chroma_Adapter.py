@@ -1,28 +1,69 @@
+import re
+import logging
+import threading
 import numpy as np
 from chromadb.utils.embedding_functions import GoogleGenerativeAiEmbeddingFunction
+from embeddings.embedding_cache import get_embedding_cache
+
+logger = logging.getLogger(__name__)
+
+
+def _to_float_list(emb) -> list[float]:
+    # Convert each np.ndarray or list to a plain Python list of floats
+    if isinstance(emb, np.ndarray):
+        return emb.tolist()
+    elif isinstance(emb, list):
+        return emb
+    else:
+        raise TypeError(f"Unexpected embedding type: {type(emb)}")
+
 
 class FixedGoogleEmbedding(GoogleGenerativeAiEmbeddingFunction):
+    _stats_lock = threading.Lock()
+    cache_hits = 0
+    cache_misses = 0
+
+    def _cache_key(self, text: str) -> str:
+        model = getattr(self, "model_name", None) or getattr(self, "_model_name", None) or "models/embedding-001"
+        task_type = getattr(self, "task_type", None) or getattr(self, "_task_type", None) or ""
+        normalized = re.sub(r"\s+", " ", text).strip().lower()
+        return f"{model}|{task_type}|{normalized}"
+
+    def _embed_with_cache(self, texts: list[str]) -> list[list[float]]:
+        cache = get_embedding_cache()
+        keys = [self._cache_key(text) for text in texts]
+        cached = cache.get_many(keys)
+
+        # Embed each missing key once, even if it appears several times in texts
+        missing: dict[str, str] = {}
+        for key, text, vector in zip(keys, texts, cached):
+            if vector is None and key not in missing:
+                missing[key] = text
+
+        if missing:
+            raw_embeddings = super().__call__(list(missing.values()))
+            fresh = dict(zip(missing.keys(), (_to_float_list(emb) for emb in raw_embeddings)))
+            cache.put_many(list(fresh.keys()), list(fresh.values()))
+        else:
+            fresh = {}
+
+        with self._stats_lock:
+            FixedGoogleEmbedding.cache_hits += len(texts) - len(missing)
+            FixedGoogleEmbedding.cache_misses += len(missing)
+            lookups = FixedGoogleEmbedding.cache_hits + FixedGoogleEmbedding.cache_misses
+            hit_rate = FixedGoogleEmbedding.cache_hits / lookups if lookups else 0.0
+        logger.info(
+            f"Embedded {len(texts)} text(s): {len(texts) - len(missing)} from cache, "
+            f"{len(missing)} with Gemini (overall hit rate {hit_rate:.1%})"
+        )
+
+        return [
+            fresh[key] if vector is None else vector.tolist()
+            for key, vector in zip(keys, cached)
+        ]
+
     def embed_documents(self, texts: list[str]) -> list[list[float]]:
-        raw_embeddings = super().__call__(texts)
-        # Convert each np.ndarray or list to a plain Python list of floats
-        embeddings = []
-        for emb in raw_embeddings:
-            if isinstance(emb, np.ndarray):
-                embeddings.append(emb.tolist())
-            elif isinstance(emb, list):
-                embeddings.append(emb)
-            else:
-                raise TypeError(f"Unexpected embedding type: {type(emb)}")
-        print(f"document {texts} embeded with Gemini")
-        return embeddings
+        return self._embed_with_cache(texts)
 
     def embed_query(self, text: str) -> list[float]:
-        # GoogleGenerativeAiEmbeddingFunction.__call__ expects a list input, so wrap text in list
-        raw_embedding = super().__call__([text])
-        emb = raw_embedding[0]
-        if isinstance(emb, np.ndarray):
-            return emb.tolist()
-        elif isinstance(emb, list):
-            return emb
-        else:
-            raise TypeError(f"Unexpected embedding type: {type(emb)}")
+        return self._embed_with_cache([text])[0]
@@ -0,0 +1,102 @@
+import threading
+import logging
+from typing import Callable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class SkillIndex:
+    """
+    In-memory copy of the Chroma skills collection as a matrix of unit-normalized
+    float32 embeddings, so nearest-neighbour lookups are one matrix product per batch.
+
+    Scores are reported with the vector store's own relevance function, computed
+    on the distance Chroma would return for unit vectors, so thresholds keep
+    their meaning.
+    """
+
+    def __init__(self, vectorstore, relevance_score_fn: Callable[[float], float]):
+        self.vectorstore = vectorstore
+        self.relevance_score_fn = relevance_score_fn
+        self.space = (vectorstore._collection.metadata or {}).get("hnsw:space", "l2")
+        self._lock = threading.Lock()
+        self._skills: list[str] = []
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self.reload()
+
+    def reload(self) -> None:
+        """Rebuild the whole index from Chroma."""
+        result = self.vectorstore.get(include=["embeddings", "documents"])
+        skills = list(result["documents"] or [])
+        embeddings = result["embeddings"]
+        matrix = (
+            _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+            if len(skills)
+            else np.zeros((0, 0), dtype=np.float32)
+        )
+        with self._lock:
+            self._skills = skills
+            self._matrix = matrix
+        logger.info(f"Loaded {len(skills)} skills into the in-memory skill index")
+
+    def add(self, ids: list[str]) -> None:
+        """Pull freshly added skills from Chroma into the index."""
+        if not ids:
+            return
+        result = self.vectorstore.get(ids=list(ids), include=["embeddings", "documents"])
+        if not result["ids"]:
+            return
+        new_skills = list(result["documents"])
+        new_rows = _normalize_rows(np.asarray(result["embeddings"], dtype=np.float32))
+        replaced = set(new_skills)
+        with self._lock:
+            keep = [i for i, skill in enumerate(self._skills) if skill not in replaced]
+            if self._matrix.size:
+                matrix = np.vstack([self._matrix[keep], new_rows])
+            else:
+                matrix = new_rows
+            self._skills = [self._skills[i] for i in keep] + new_skills
+            self._matrix = matrix
+
+    def remove(self, ids: list[str]) -> None:
+        to_remove = set(ids)
+        with self._lock:
+            keep = [i for i, skill in enumerate(self._skills) if skill not in to_remove]
+            self._skills = [self._skills[i] for i in keep]
+            self._matrix = self._matrix[keep] if self._matrix.size else self._matrix
+
+    def _distance(self, cosine: float) -> float:
+        if self.space == "cosine":
+            return 1.0 - cosine
+        if self.space == "ip":
+            return 1.0 - cosine
+        # Squared L2 between unit vectors
+        return 2.0 - 2.0 * cosine
+
+    def nearest(self, embeddings: list[list[float]], score_threshold: float) -> list[Optional[str]]:
+        """Best skill for each query embedding, or None when its relevance is below score_threshold."""
+        with self._lock:
+            skills, matrix = self._skills, self._matrix
+        if not skills or not len(embeddings):
+            return [None] * len(embeddings)
+
+        queries = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        similarities = queries @ matrix.T
+        best = similarities.argmax(axis=1)
+
+        matches: list[Optional[str]] = []
+        for row, column in enumerate(best):
+            score = self.relevance_score_fn(self._distance(float(similarities[row, column])))
+            matches.append(skills[column] if score >= score_threshold else None)
+        return matches
+
+    def __len__(self) -> int:
+        return len(self._skills)
@@ -0,0 +1,161 @@
+import os
+import json
+import glob
+import time
+import logging
+import argparse
+from datetime import date
+
+from clients.mongo_client import mongo_candidat_init, get_skills_mongo
+from clients.minio_client import MinioClientService
+from llms.ollamaClient import OllamaClient
+from llms.groqClient import GroqClient, get_groq_rate_limiter
+from llms.cachedClient import CachedLLMClient
+from llms.timedClient import TimedLLMClient
+from llms.routingClient import RoutingLLMClient
+from services.cache_service import CACHE_DIR
+from services.ingestion_service import ingest_resumes, DEFAULT_MAX_WORKERS, DEFAULT_MAX_LLM_CALLS, DUPLICATE_REJECT, DUPLICATE_MERGE
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(levelname)s] %(asctime)s - %(name)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT = os.path.join(CACHE_DIR, "import_checkpoint.jsonl")
+
+
+class LocalPDF:
+    """A PDF on disk with the file-uploader interface the ingestion service expects, read on demand"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+
+    def getvalue(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+def find_pdfs(sources: list[str]) -> list[str]:
+    """PDF paths from directories (walked recursively), glob patterns and plain file paths"""
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            for root, _, files in os.walk(source):
+                paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(".pdf"))
+        else:
+            paths.extend(path for path in glob.glob(source, recursive=True) if path.lower().endswith(".pdf"))
+    return sorted(dict.fromkeys(os.path.abspath(path) for path in paths))
+
+
+def load_checkpoint(checkpoint_path: str) -> set[str]:
+    """Paths already stored or identified as duplicates by a previous run"""
+    completed = set()
+    if not os.path.exists(checkpoint_path):
+        return completed
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Last line of a run that was killed mid-write
+                continue
+            if entry.get("status") == "done":
+                completed.add(entry["path"])
+    return completed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import PDF resumes from directories or glob patterns")
+    parser.add_argument("sources", nargs="+", help="directories, PDF files or glob patterns (e.g. 'archive/**/*.pdf')")
+    parser.add_argument("--llm", choices=["groq", "ollama", "auto"], default="groq")
+    parser.add_argument("--skill-strategy", choices=["llm", "chroma"], default="llm")
+    parser.add_argument("--job-offer", default="")
+    parser.add_argument("--job-offer-date", type=date.fromisoformat, default=None, help="YYYY-MM-DD")
+    parser.add_argument("--duplicates", choices=[DUPLICATE_REJECT, DUPLICATE_MERGE], default=DUPLICATE_REJECT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS)
+    parser.add_argument("--max-llm-calls", type=int, default=DEFAULT_MAX_LLM_CALLS)
+    parser.add_argument("--batch-size", type=int, default=50, help="files read and checkpointed together")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    args = parser.parse_args()
+
+    paths = find_pdfs(args.sources)
+    completed = load_checkpoint(args.checkpoint)
+    pending = [path for path in paths if path not in completed]
+    logger.info(f"Found {len(paths)} PDF files, {len(paths) - len(pending)} already imported, {len(pending)} to go")
+    if not pending:
+        return
+
+    if args.llm == "auto":
+        backend = RoutingLLMClient([GroqClient(), OllamaClient()])
+    else:
+        backend = GroqClient() if args.llm == "groq" else OllamaClient()
+    timed_client = TimedLLMClient(backend)
+    # Timing sits under the cache so percentiles cover only calls that reached a backend. They are
+    # end-to-end: GroqClient's rate-limit waits and retries are included (see the throttling line)
+    llm_client = CachedLLMClient(timed_client)
+    minio_client = MinioClientService()
+    collection = mongo_candidat_init()
+
+    counts = {"stored": 0, "duplicate": 0, "failed": 0}
+    failures = []
+    os.makedirs(os.path.dirname(os.path.abspath(args.checkpoint)), exist_ok=True)
+    start = time.perf_counter()
+
+    with open(args.checkpoint, "a", encoding="utf-8") as checkpoint:
+        for batch_start in range(0, len(pending), args.batch_size):
+            batch = [LocalPDF(path) for path in pending[batch_start:batch_start + args.batch_size]]
+            results = ingest_resumes(
+                batch,
+                llm_client,
+                collection,
+                minio_client,
+                get_skills_mongo(),
+                job_offer=args.job_offer,
+                job_offer_date=args.job_offer_date,
+                skill_strategy=args.skill_strategy,
+                duplicate_policy=args.duplicates,
+                max_workers=args.workers,
+                max_llm_calls=args.max_llm_calls,
+            )
+            for pdf, result in zip(batch, results):
+                status = "done"
+                if result["success"]:
+                    counts["stored"] += 1
+                elif "Duplicate" in result["message"]:
+                    counts["duplicate"] += 1
+                else:
+                    counts["failed"] += 1
+                    failures.append((pdf.path, result["message"]))
+                    status = "failed"
+                checkpoint.write(json.dumps({"path": pdf.path, "status": status, "message": result["message"]}) + "\n")
+            checkpoint.flush()
+
+            done = batch_start + len(batch)
+            elapsed = time.perf_counter() - start
+            logger.info(f"{done}/{len(pending)} files, {done / elapsed:.2f} files/s")
+
+    elapsed = time.perf_counter() - start
+    print("\n=== Import summary ===")
+    print(f"Files:        {len(pending)} in {elapsed:.1f}s ({len(pending) / elapsed:.2f} files/s)")
+    print(f"Stored:       {counts['stored']}")
+    print(f"Duplicates:   {counts['duplicate']}")
+    print(f"Failed:       {counts['failed']}")
+    print(f"LLM calls:    {len(timed_client.latencies)} ({timed_client.errors} errors), cache: {llm_client.stats()}")
+    print(
+        f"LLM latency:  p50 {timed_client.percentile(50):.2f}s | p90 {timed_client.percentile(90):.2f}s | "
+        f"p99 {timed_client.percentile(99):.2f}s | max {timed_client.percentile(100):.2f}s"
+    )
+    print("              end-to-end per call, including rate-limit waits and retries")
+    if args.llm in ("groq", "auto"):
+        print(f"Throttling:   {get_groq_rate_limiter().stats()}")
+    if failures:
+        print("\nFailures (retried on the next run):")
+        for path, message in failures:
+            print(f"  {path}: {message}")
+
+
+if __name__ == "__main__":
+    # python import_resumes.py ./archive --workers 8 --max-llm-calls 4
+    main()
@@ -1,24 +1,110 @@
 from llms.llmClientABC import LLMClientABC
-from groq import Groq
+from llms.concurrency import InFlightLimiter
+from llms.rate_limiter import RateLimiter, estimate_tokens, parse_retry_after, backoff_delay
+from groq import Groq, AsyncGroq, RateLimitError, APIConnectionError, InternalServerError
 import os
+import time
+import asyncio
+import logging
+import threading
 import dotenv
 
+logger = logging.getLogger(__name__)
+
+dotenv.load_dotenv()
+GROQ_MAX_IN_FLIGHT = int(os.getenv("GROQ_MAX_IN_FLIGHT", "4"))
+# Quota of the API key, shared by every GroqClient in the process
+GROQ_RPM = int(os.getenv("GROQ_RPM", "30"))
+GROQ_TPM = int(os.getenv("GROQ_TPM", "12000"))
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "5"))
+# Completion tokens reserved per request until the real usage is known
+GROQ_COMPLETION_TOKENS_ESTIMATE = int(os.getenv("GROQ_COMPLETION_TOKENS_ESTIMATE", "1000"))
+
+_RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_groq_rate_limiter() -> RateLimiter:
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(GROQ_RPM, GROQ_TPM)
+        return _rate_limiter
+
 class GroqClient(LLMClientABC):
 
 
-    def __init__(self, modelName="llama-3.3-70b-versatile"):
+    def __init__(self, modelName="llama-3.3-70b-versatile", max_in_flight: int = GROQ_MAX_IN_FLIGHT, rate_limiter: RateLimiter = None):
         dotenv.load_dotenv()
-        self.client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+        # Retries are handled here, in step with the rate limiter, not by the SDK
+        self.client = Groq(api_key=os.environ.get("GROQ_API_KEY"), max_retries=0)
+        self.async_client = AsyncGroq(api_key=os.environ.get("GROQ_API_KEY"), max_retries=0)
         self.modelName = modelName
+        self.limiter = InFlightLimiter(max_in_flight)
+        self.rate_limiter = rate_limiter or get_groq_rate_limiter()
 
-    def generate(self, prompt: str) -> str:
-        completion = self.client.chat.completions.create(
-        model=self.modelName,
-        messages=[
+    def _messages(self, prompt: str) -> list:
+        return [
             {"role": "user", "content": prompt}
         ]
-        )
+
+    def _retry_delay(self, error: Exception, attempt: int, estimated_tokens: int) -> float:
+        """Seconds this caller should sleep before retrying; a 429 holds every caller through the rate limiter instead"""
+        self.rate_limiter.release(estimated_tokens)
+        if attempt == GROQ_MAX_RETRIES:
+            # The caller gives up: nothing to wait for, and no reason to hold anyone else back
+            logger.warning(f"{self} request failed ({type(error).__name__}) after {attempt + 1} attempts, giving up")
+            return 0.0
+        response = getattr(error, "response", None)
+        delay = backoff_delay(attempt, parse_retry_after(getattr(response, "headers", None)))
+        logger.warning(f"{self} request failed ({type(error).__name__}), attempt {attempt + 1}/{GROQ_MAX_RETRIES + 1}, retrying in {delay:.1f}s")
+        if isinstance(error, RateLimitError):
+            self.rate_limiter.backoff(delay)
+            return 0.0
+        return delay
+
+    def _record_usage(self, completion, estimated_tokens: int) -> str:
+        usage = getattr(completion, "usage", None)
+        self.rate_limiter.record_usage(estimated_tokens, getattr(usage, "total_tokens", None))
         return completion.choices[0].message.content
-    
+
+    def generate(self, prompt: str) -> str:
+        estimated_tokens = estimate_tokens(prompt) + GROQ_COMPLETION_TOKENS_ESTIMATE
+        for attempt in range(GROQ_MAX_RETRIES + 1):
+            self.rate_limiter.acquire(estimated_tokens)
+            try:
+                with self.limiter:
+                    completion = self.client.chat.completions.create(
+                        model=self.modelName,
+                        messages=self._messages(prompt)
+                    )
+            except _RETRYABLE_ERRORS as e:
+                delay = self._retry_delay(e, attempt, estimated_tokens)
+                if attempt == GROQ_MAX_RETRIES:
+                    raise
+                time.sleep(delay)
+                continue
+            return self._record_usage(completion, estimated_tokens)
+
+    async def agenerate(self, prompt: str) -> str:
+        estimated_tokens = estimate_tokens(prompt) + GROQ_COMPLETION_TOKENS_ESTIMATE
+        for attempt in range(GROQ_MAX_RETRIES + 1):
+            await self.rate_limiter.acquire_async(estimated_tokens)
+            try:
+                async with self.limiter.acquire_async():
+                    completion = await self.async_client.chat.completions.create(
+                        model=self.modelName,
+                        messages=self._messages(prompt)
+                    )
+            except _RETRYABLE_ERRORS as e:
+                delay = self._retry_delay(e, attempt, estimated_tokens)
+                if attempt == GROQ_MAX_RETRIES:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            return self._record_usage(completion, estimated_tokens)
+
     def __str__(self) -> str:
         return "Groq :"+ self.modelName
\ No newline at end of file
@@ -0,0 +1,22 @@
+from llms.llmClientABC import LLMClientABC
+from llms.concurrency import InFlightLimiter
+
+
+class BoundedLLMClient(LLMClientABC):
+    """Wraps another client and caps the number of concurrent generate / agenerate calls."""
+
+    def __init__(self, client: LLMClientABC, max_in_flight: int = 2):
+        self.client = client
+        self.max_in_flight = max_in_flight
+        self.limiter = InFlightLimiter(max_in_flight)
+
+    def generate(self, prompt: str) -> str:
+        with self.limiter:
+            return self.client.generate(prompt)
+
+    async def agenerate(self, prompt: str) -> str:
+        async with self.limiter.acquire_async():
+            return await self.client.agenerate(prompt)
+
+    def __str__(self) -> str:
+        return str(self.client)
@@ -0,0 +1,81 @@
+import os
+import hashlib
+import logging
+import threading
+
+from llms.llmClientABC import LLMClientABC
+from services.cache_service import DiskCache
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_llm_response_cache() -> DiskCache:
+    """On-disk cache shared by every CachedLLMClient; keys already include the model name."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = DiskCache(
+                "llm_responses",
+                max_bytes=LLM_CACHE_MAX_BYTES,
+                max_entries=LLM_CACHE_MAX_ENTRIES,
+                ttl_seconds=LLM_CACHE_TTL_SECONDS,
+            )
+        return _shared_cache
+
+
+class CachedLLMClient(LLMClientABC):
+    """
+    Wraps another client and serves repeated prompts from a persistent cache.
+    Answers a RoutingLLMClient got from a fallback backend are returned but not stored.
+    """
+
+    def __init__(self, client: LLMClientABC, cache: DiskCache = None):
+        self.client = client
+        self.cache = cache or get_llm_response_cache()
+
+    def _key(self, prompt: str) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return f"{self.client}:{prompt_hash}"
+
+    def generate(self, prompt: str) -> str:
+        key = self._key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.info(f"LLM cache hit for {self.client} ({self.cache.stats()})")
+            return cached.decode("utf-8")
+
+        if hasattr(self.client, "generate_with_source"):
+            response, fallback = self.client.generate_with_source(prompt)
+        else:
+            response, fallback = self.client.generate(prompt), False
+        if response and not fallback:
+            self.cache.set(key, response.encode("utf-8"))
+        return response
+
+    async def agenerate(self, prompt: str) -> str:
+        key = self._key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.info(f"LLM cache hit for {self.client} ({self.cache.stats()})")
+            return cached.decode("utf-8")
+
+        if hasattr(self.client, "agenerate_with_source"):
+            response, fallback = await self.client.agenerate_with_source(prompt)
+        else:
+            response, fallback = await self.client.agenerate(prompt), False
+        if response and not fallback:
+            self.cache.set(key, response.encode("utf-8"))
+        return response
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+    def __str__(self) -> str:
+        return str(self.client)
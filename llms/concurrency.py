@@ -0,0 +1,64 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
+
+class InFlightLimiter:
+    """
+    Caps in-flight requests to max_in_flight, counting threaded callers and coroutines
+    on any event loop together. Threads wait on a condition; coroutines wait on a future
+    that a release wakes from whichever thread it happens on.
+    """
+
+    def __init__(self, max_in_flight: int):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._condition = threading.Condition()
+        self._async_waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def __enter__(self):
+        with self._condition:
+            while self.in_flight >= self.max_in_flight:
+                self._condition.wait()
+            self.in_flight += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._release()
+
+    def _release(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+            waiters, self._async_waiters = self._async_waiters, []
+        # Every waiting coroutine retries; the ones that lose the slot wait again
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+            except RuntimeError:
+                # The waiter's event loop is closed
+                pass
+
+    @asynccontextmanager
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if self.in_flight < self.max_in_flight:
+                    self.in_flight += 1
+                    break
+                waiter = (loop, loop.create_future())
+                self._async_waiters.append(waiter)
+            try:
+                await waiter[1]
+            except asyncio.CancelledError:
+                with self._condition:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+                raise
+        try:
+            yield self
+        finally:
+            self._release()
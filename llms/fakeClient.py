@@ -0,0 +1,66 @@
+import time
+import asyncio
+import threading
+from typing import Callable, Optional, Union
+
+from llms.llmClientABC import LLMClientABC
+from llms.concurrency import InFlightLimiter
+
+
+class FakeLLMClient(LLMClientABC):
+    """
+    In-memory client for benchmarks and offline runs: answers after a fixed latency,
+    with a canned response or one computed from the prompt. No network access.
+    """
+
+    def __init__(self, response: Union[str, Callable[[str], str]] = "{}", latency: float = 0.5,
+                 max_in_flight: Optional[int] = None, name: str = "fake"):
+        self.response = response
+        self.latency = latency
+        self.name = name
+        self.limiter = InFlightLimiter(max_in_flight) if max_in_flight else None
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _answer(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+        return self.response(prompt) if callable(self.response) else self.response
+
+    def generate(self, prompt: str) -> str:
+        if self.limiter is None:
+            time.sleep(self.latency)
+            return self._answer(prompt)
+        with self.limiter:
+            time.sleep(self.latency)
+            return self._answer(prompt)
+
+    async def agenerate(self, prompt: str) -> str:
+        if self.limiter is None:
+            await asyncio.sleep(self.latency)
+            return self._answer(prompt)
+        async with self.limiter.acquire_async():
+            await asyncio.sleep(self.latency)
+            return self._answer(prompt)
+
+    def __str__(self) -> str:
+        return "Fake :" + self.name
+
+
+async def _benchmark(client: LLMClientABC, prompts: list[str]) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(client.agenerate(prompt) for prompt in prompts))
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    # python -m llms.fakeClient
+    prompts = [f"prompt {i}" for i in range(20)]
+    for max_in_flight in (1, 4, 20):
+        client = FakeLLMClient(latency=0.1, max_in_flight=max_in_flight)
+        start = time.perf_counter()
+        for prompt in prompts[:5]:
+            client.generate(prompt)
+        sequential = (time.perf_counter() - start) * len(prompts) / 5
+        concurrent = asyncio.run(_benchmark(client, prompts))
+        print(f"max_in_flight={max_in_flight:<3} sequential ~{sequential:.2f}s | agenerate x{len(prompts)}: {concurrent:.2f}s")
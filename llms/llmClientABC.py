@@ -1,6 +1,11 @@
+import asyncio
 from abc import ABC, abstractmethod
 
 class LLMClientABC(ABC):
     @abstractmethod
     def generate(self,prompt: str) -> str:
-        pass
\ No newline at end of file
+        pass
+
+    async def agenerate(self, prompt: str) -> str:
+        """Coroutine version of generate; runs it in a thread unless the client has a native async API."""
+        return await asyncio.to_thread(self.generate, prompt)
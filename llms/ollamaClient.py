@@ -1,14 +1,25 @@
+import os
 from llms.llmClientABC import LLMClientABC
+from llms.concurrency import InFlightLimiter
 from langchain_ollama import ChatOllama
 
+# A local model serves few requests at once; extra ones only queue inside Ollama
+OLLAMA_MAX_IN_FLIGHT = int(os.getenv("OLLAMA_MAX_IN_FLIGHT", "1"))
+
 class OllamaClient(LLMClientABC):
 
-    def __init__(self,modelName = "llama3.2"):
+    def __init__(self,modelName = "llama3.2", max_in_flight: int = OLLAMA_MAX_IN_FLIGHT):
         self.modelName = modelName
         self.model = ChatOllama(model=self.modelName)
+        self.limiter = InFlightLimiter(max_in_flight)
 
     def generate(self, prompt: str) -> str:
-        return self.model.invoke(prompt).content
+        with self.limiter:
+            return self.model.invoke(prompt).content
+
+    async def agenerate(self, prompt: str) -> str:
+        async with self.limiter.acquire_async():
+            return (await self.model.ainvoke(prompt)).content
     
     def __str__(self) -> str:
         return "Ollama :"+ self.modelName
\ No newline at end of file
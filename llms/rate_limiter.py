@@ -0,0 +1,135 @@
+import time
+import random
+import asyncio
+import threading
+from typing import Optional
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """Seconds from a retry-after header, if the server sent one as a number."""
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None, base: float = 1.0, cap: float = 60.0) -> float:
+    """
+    Seconds to wait before retry number attempt + 1: at least retry_after when the server
+    gave one, otherwise exponential with full jitter so retrying clients spread out.
+    """
+    if retry_after is not None:
+        return retry_after + random.uniform(0, base)
+    return random.uniform(base, min(cap, base * 2 ** (attempt + 1)))
+
+
+class TokenBucket:
+    """Holds up to capacity units, refilled continuously. Not thread-safe on its own."""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.available = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take amount right away, going into debt if needed; returns the seconds until the debt is repaid."""
+        self._refill(now)
+        self.available -= min(amount, self.capacity)
+        return 0.0 if self.available >= 0 else -self.available / self.refill_per_second
+
+    def refund(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.available = min(self.capacity, self.available + amount)
+
+
+class RateLimiter:
+    """
+    Client-side requests-per-minute and tokens-per-minute quotas.
+
+    Each request reserves one request and its estimated tokens up front, so
+    concurrent callers queue in arrival order instead of bursting past the quota.
+    The estimate is corrected with the real usage once the response arrives.
+    When the server still answers 429, backoff() holds every caller, not just
+    the one that was refused.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self._lock = threading.Lock()
+        self._blocked_until = 0.0
+        self.throttled_seconds = 0.0
+        self.throttled_requests = 0
+        self.rate_limited = 0
+        self.refused = 0
+
+    def _reserve(self, estimated_tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            delay = max(
+                self.requests.reserve(1, now),
+                self.tokens.reserve(estimated_tokens, now),
+                self._blocked_until - now,
+                0.0,
+            )
+            if delay > 0:
+                self.throttled_seconds += delay
+                self.throttled_requests += 1
+            return delay
+
+    def acquire(self, estimated_tokens: int) -> None:
+        delay = self._reserve(estimated_tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, estimated_tokens: int) -> None:
+        delay = self._reserve(estimated_tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """Replace the estimate reserved for a finished request with the tokens it really used."""
+        if actual_tokens is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if actual_tokens > estimated_tokens:
+                self.tokens.reserve(actual_tokens - estimated_tokens, now)
+            else:
+                self.tokens.refund(estimated_tokens - actual_tokens, now)
+
+    def release(self, estimated_tokens: int) -> None:
+        """Give back the reservation of a request the server refused."""
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refund(1, now)
+            self.tokens.refund(estimated_tokens, now)
+            self.refused += 1
+
+    def backoff(self, seconds: float) -> None:
+        """The server refused a request: hold every caller for the given number of seconds."""
+        with self._lock:
+            self.rate_limited += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "throttled_seconds": round(self.throttled_seconds, 2),
+                "throttled_requests": self.throttled_requests,
+                "rate_limited": self.rate_limited,
+                "refused": self.refused,
+            }
@@ -0,0 +1,248 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional
+
+from llms.llmClientABC import LLMClientABC
+from llms.timedClient import percentile
+
+logger = logging.getLogger(__name__)
+
+ROUTER_WINDOW = int(os.getenv("ROUTER_WINDOW", "50"))
+ROUTER_FAILURE_THRESHOLD = int(os.getenv("ROUTER_FAILURE_THRESHOLD", "3"))
+ROUTER_COOLDOWN_SECONDS = float(os.getenv("ROUTER_COOLDOWN_SECONDS", "30"))
+ROUTER_MAX_ERROR_RATE = float(os.getenv("ROUTER_MAX_ERROR_RATE", "0.5"))
+# Samples needed before the error rate or the p95 latency of a backend are trusted
+ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", "10"))
+# How much faster (median latency) a backend must be to go ahead of the one listed before it
+ROUTER_PREFERENCE_FACTOR = float(os.getenv("ROUTER_PREFERENCE_FACTOR", "2.0"))
+
+# Sync calls run here so the caller can stop waiting on a slow backend; losers of a hedge finish in the background
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("ROUTER_MAX_THREADS", "16")), thread_name_prefix="llm-router")
+
+
+class _BackendHealth:
+    """Rolling latency / outcome window and circuit breaker state of one backend."""
+
+    def __init__(self, window: int):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trial_in_flight = False
+
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def state(self, now: float) -> str:
+        if self.open_until == 0.0:
+            return "closed"
+        return "open" if now < self.open_until else "half-open"
+
+
+class RoutingLLMClient(LLMClientABC):
+    """
+    Sends each prompt to the best healthy backend. Backends are given best quality first;
+    once every healthy backend has ROUTER_MIN_SAMPLES latencies they are ranked by median
+    latency, where each step down the list must be ROUTER_PREFERENCE_FACTOR times faster
+    to go ahead, so a small local model only takes over when the preferred one is much slower.
+
+    A backend's circuit opens after ROUTER_FAILURE_THRESHOLD consecutive failures, or when
+    its error rate over the rolling window exceeds ROUTER_MAX_ERROR_RATE; it is then skipped
+    for ROUTER_COOLDOWN_SECONDS and gets a single trial request. A failed request falls
+    over to the next backend, and with hedging enabled a request still running past the
+    backend's p95 latency is raced against the next backend.
+
+    generate_with_source / agenerate_with_source also say whether a fallback backend
+    answered, so CachedLLMClient does not keep a fallback answer once the preferred
+    backend is back.
+    """
+
+    def __init__(self, backends: list[LLMClientABC], hedge: bool = True, window: int = ROUTER_WINDOW,
+                 failure_threshold: int = ROUTER_FAILURE_THRESHOLD, cooldown_seconds: float = ROUTER_COOLDOWN_SECONDS):
+        if not backends:
+            raise ValueError("RoutingLLMClient needs at least one backend")
+        self.backends = list(backends)
+        self.hedge = hedge
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._health = [_BackendHealth(window) for _ in self.backends]
+        self._lock = threading.Lock()
+        self.hedged_requests = 0
+
+    def _candidates(self) -> list[int]:
+        """Backend indexes to try, in order"""
+        now = time.monotonic()
+        with self._lock:
+            candidates = []
+            for index, health in enumerate(self._health):
+                state = health.state(now)
+                if state == "open" or (state == "half-open" and health.trial_in_flight):
+                    continue
+                candidates.append(index)
+            if not candidates:
+                # Every circuit is open: try the one that reopens first rather than fail outright
+                return [min(range(len(self._health)), key=lambda i: self._health[i].open_until)]
+            medians = {index: percentile(self._health[index].latencies, 50) for index in candidates}
+            if len(candidates) > 1 and all(len(self._health[index].latencies) >= ROUTER_MIN_SAMPLES for index in candidates):
+                candidates.sort(key=lambda index: (medians[index] * ROUTER_PREFERENCE_FACTOR ** index, index))
+            return candidates
+
+    def _begin(self, index: int) -> None:
+        with self._lock:
+            health = self._health[index]
+            if health.state(time.monotonic()) == "half-open":
+                health.trial_in_flight = True
+
+    def _cancelled(self, index: int) -> None:
+        """A call abandoned by its caller (or a hedge it lost) says nothing about the backend, but frees its trial slot"""
+        with self._lock:
+            self._health[index].trial_in_flight = False
+
+    def _record(self, index: int, latency: float, ok: bool) -> None:
+        with self._lock:
+            health = self._health[index]
+            health.outcomes.append(ok)
+            health.trial_in_flight = False
+            if ok:
+                health.latencies.append(latency)
+                health.consecutive_failures = 0
+                health.open_until = 0.0
+                return
+            health.consecutive_failures += 1
+            too_many_errors = len(health.outcomes) >= ROUTER_MIN_SAMPLES and health.error_rate() > ROUTER_MAX_ERROR_RATE
+            if health.open_until or too_many_errors or health.consecutive_failures >= self.failure_threshold:
+                health.open_until = time.monotonic() + self.cooldown_seconds
+                logger.warning(f"Circuit opened for {self.backends[index]} for {self.cooldown_seconds:.0f}s")
+
+    def _hedge_deadline(self, index: int, remaining: int) -> Optional[float]:
+        """Seconds to wait on a backend before racing the next one, None to wait for it"""
+        if not self.hedge or not remaining:
+            return None
+        with self._lock:
+            latencies = list(self._health[index].latencies)
+        if len(latencies) < ROUTER_MIN_SAMPLES:
+            return None
+        return percentile(latencies, 95)
+
+    def _call(self, index: int, prompt: str) -> str:
+        start = time.perf_counter()
+        try:
+            response = self.backends[index].generate(prompt)
+        except Exception:
+            self._record(index, time.perf_counter() - start, False)
+            raise
+        self._record(index, time.perf_counter() - start, True)
+        return response
+
+    async def _acall(self, index: int, prompt: str) -> str:
+        start = time.perf_counter()
+        try:
+            response = await self.backends[index].agenerate(prompt)
+        except asyncio.CancelledError:
+            self._cancelled(index)
+            raise
+        except Exception:
+            self._record(index, time.perf_counter() - start, False)
+            raise
+        self._record(index, time.perf_counter() - start, True)
+        return response
+
+    def generate(self, prompt: str) -> str:
+        return self.generate_with_source(prompt)[0]
+
+    async def agenerate(self, prompt: str) -> str:
+        return (await self.agenerate_with_source(prompt))[0]
+
+    def generate_with_source(self, prompt: str) -> tuple[str, bool]:
+        """The response and whether it came from a fallback rather than the first backend"""
+        candidates = self._candidates()
+        pending = {}
+        errors = []
+
+        def launch():
+            index = candidates[len(pending) + len(errors)]
+            self._begin(index)
+            pending[_executor.submit(self._call, index, prompt)] = index
+
+        launch()
+        while pending:
+            timeout = None
+            if len(pending) == 1:
+                remaining = len(candidates) - len(errors) - 1
+                timeout = self._hedge_deadline(next(iter(pending.values())), remaining)
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                logger.info(f"{self.backends[next(iter(pending.values()))]} past its p95 ({timeout:.1f}s), hedging")
+                with self._lock:
+                    self.hedged_requests += 1
+                launch()
+                continue
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    return future.result(), index > 0
+                except Exception as e:
+                    errors.append(e)
+            if not pending and len(errors) < len(candidates):
+                launch()
+        raise errors[-1]
+
+    async def agenerate_with_source(self, prompt: str) -> tuple[str, bool]:
+        candidates = self._candidates()
+        pending = {}
+        errors = []
+
+        def launch():
+            index = candidates[len(pending) + len(errors)]
+            self._begin(index)
+            pending[asyncio.create_task(self._acall(index, prompt))] = index
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if len(pending) == 1:
+                    remaining = len(candidates) - len(errors) - 1
+                    timeout = self._hedge_deadline(next(iter(pending.values())), remaining)
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    with self._lock:
+                        self.hedged_requests += 1
+                    launch()
+                    continue
+                for task in done:
+                    index = pending.pop(task)
+                    try:
+                        return task.result(), index > 0
+                    except Exception as e:
+                        errors.append(e)
+                if not pending and len(errors) < len(candidates):
+                    launch()
+            raise errors[-1]
+        finally:
+            # The hedge loser is not needed anymore
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> list[dict]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "backend": str(backend),
+                    "state": health.state(now),
+                    "p50": percentile(health.latencies, 50),
+                    "p95": percentile(health.latencies, 95),
+                    "error_rate": round(health.error_rate(), 3),
+                    "calls": len(health.outcomes),
+                }
+                for backend, health in zip(self.backends, self._health)
+            ]
+
+    def __str__(self) -> str:
+        return "Auto (" + ", ".join(str(backend) for backend in self.backends) + ")"
@@ -0,0 +1,69 @@
+import math
+import time
+import threading
+from typing import Optional
+
+from llms.llmClientABC import LLMClientABC
+
+
+def percentile(values, q: float) -> Optional[float]:
+    """Nearest-rank percentile of values, None when there are none."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = min(len(ordered), max(1, math.ceil(q / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+class TimedLLMClient(LLMClientABC):
+    """Wraps another client and records the latency of every generate call, in seconds."""
+
+    def __init__(self, client: LLMClientABC):
+        self.client = client
+        self._lock = threading.Lock()
+        self.latencies: list[float] = []
+        self.errors = 0
+
+    def generate(self, prompt: str) -> str:
+        return self.generate_with_source(prompt)[0]
+
+    async def agenerate(self, prompt: str) -> str:
+        return (await self.agenerate_with_source(prompt))[0]
+
+    def generate_with_source(self, prompt: str) -> tuple[str, bool]:
+        """Timed call that passes on a RoutingLLMClient's fallback flag, so a cache above still sees it"""
+        start = time.perf_counter()
+        try:
+            if hasattr(self.client, "generate_with_source"):
+                return self.client.generate_with_source(prompt)
+            return self.client.generate(prompt), False
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.latencies.append(time.perf_counter() - start)
+
+    async def agenerate_with_source(self, prompt: str) -> tuple[str, bool]:
+        start = time.perf_counter()
+        try:
+            if hasattr(self.client, "agenerate_with_source"):
+                return await self.client.agenerate_with_source(prompt)
+            return await self.client.agenerate(prompt), False
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.latencies.append(time.perf_counter() - start)
+
+    def percentile(self, q: float) -> float:
+        """Nearest-rank percentile of the recorded latencies, 0.0 when nothing was recorded."""
+        with self._lock:
+            value = percentile(self.latencies, q)
+        return 0.0 if value is None else value
+
+    def __str__(self) -> str:
+        return str(self.client)
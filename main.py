@@ -4,11 +4,23 @@ from pages.upload_resumePage import UploadPage
 from pages.listResume import listResume
 from pages.csvPage import CsvPage
 from pages.skillsManagementPage import SkillsManagementPage
+from clients.mongo_client import migrate_job_offer_dates, collection_jobs
+from clients.mongo_indexes import ensure_indexes, JOB_INDEXES
 
 st.set_page_config(page_title="AI Talent Scout", layout="wide")
 st.logo("./static/DXC_Logo.png",size="large")
 
 
+@st.cache_resource
+def init_database():
+    """Create the MongoDB indexes and run data migrations the pages rely on, once per server process"""
+    migrate_job_offer_dates()
+    ensure_indexes()
+    ensure_indexes(collection_jobs, JOB_INDEXES)
+
+init_database()
+
+
 
 
 pg = st.navigation([
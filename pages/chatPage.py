@@ -1,13 +1,19 @@
 import streamlit as st
 from llms.groqClient import GroqClient
 from llms.ollamaClient import OllamaClient
-from services.llm_service import query_to_resume,text_to_mongo_query
-from clients.mongo_client import mongo_candidat_init, get_skills_mongo
+from llms.cachedClient import CachedLLMClient, get_llm_response_cache
+from llms.routingClient import RoutingLLMClient
+from services.llm_service import query_to_resume,question_to_mongo_query
+from services.query_guard import UnsafeQueryError
+from services.query_compiler import fast_path_stats
+from clients.mongo_client import mongo_candidat_init, get_skills_mongo, job_offer_filter
+from utils import as_date
 from clients.minio_client import MinioClientService
+import os
 import logging
 from typing import List, Dict, Any
 import json
-from datetime import date, timedelta , datetime
+from datetime import date, timedelta
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -15,6 +21,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Cards shown per answer; one more is fetched to know whether the list was cut
+CHAT_MAX_RESULTS = int(os.getenv("CHAT_MAX_RESULTS", "20"))
+# Answers that keep their cards in the session; older ones keep only candidate ids and reload cards on display
+CHAT_CARD_HISTORY = int(os.getenv("CHAT_CARD_HISTORY", "5"))
+SUMMARY_PREVIEW_CHARS = 600
+
+# The only candidate fields display_resumes reads (_id is always returned)
+CARD_FIELDS = ("full_name", "summary", "experience_years", "location", "job_offer", "job_offer_date", "minio_file_name")
+CARD_PROJECTION = {field: 1 for field in CARD_FIELDS}
+
 # Page configuration
 st.set_page_config(
     page_title="HR Resume Assistant",
@@ -102,27 +118,61 @@ st.markdown("""
 def initialize_clients():
     """Initialize and cache client connections"""
     try:
-        ollama_client = OllamaClient()
-        groq_client = GroqClient()
+        ollama = OllamaClient()
+        groq = GroqClient()
+        ollama_client = CachedLLMClient(ollama)
+        groq_client = CachedLLMClient(groq)
+        # Groq first, the local model takes over when Groq is failing or slower than usual
+        auto_client = CachedLLMClient(RoutingLLMClient([groq, ollama]))
         mongo_collection = mongo_candidat_init()
         minio_service = MinioClientService()
         dict_skills = get_skills_mongo()
         
         logger.info("All clients initialized successfully")
-        return ollama_client, groq_client, mongo_collection, minio_service, dict_skills
+        return ollama_client, groq_client, auto_client, mongo_collection, minio_service, dict_skills
     except Exception as e:
         logger.error(f"Failed to initialize clients: {e}")
         st.error(f"Failed to initialize services: {e}")
         st.stop()
 
-def display_resumes(resumes: List[Dict[str, Any]], minio_service: MinioClientService) -> None:
-    """Display resume results with enhanced formatting"""
+def to_card(resume: Dict[str, Any]) -> Dict[str, Any]:
+    """The lightweight part of a candidate document kept in the chat history"""
+    card = {"_id": resume["_id"]}
+    if resume.get("relevance") is not None:
+        card["relevance"] = round(resume["relevance"], 3)
+    for field in CARD_FIELDS:
+        if resume.get(field) is not None:
+            card[field] = resume[field]
+    summary = card.get("summary")
+    if isinstance(summary, str) and len(summary) > SUMMARY_PREVIEW_CHARS:
+        card["summary"] = summary[:SUMMARY_PREVIEW_CHARS].rstrip() + "…"
+    return card
+
+def load_cards(collection, resume_ids: List[Any]) -> List[Dict[str, Any]]:
+    """Cards for candidate ids, in the order given; deleted candidates are skipped"""
+    if not resume_ids:
+        return []
+    cards = {doc["_id"]: to_card(doc) for doc in collection.find({"_id": {"$in": list(resume_ids)}}, CARD_PROJECTION)}
+    return [cards[resume_id] for resume_id in resume_ids if resume_id in cards]
+
+def compact_history(messages: List[Dict[str, Any]]) -> None:
+    """Drop the cards of all but the last CHAT_CARD_HISTORY answers, keeping their candidate ids"""
+    answers = [message for message in messages if message["role"] == "assistant" and "resumes" in message]
+    for message in answers[:max(0, len(answers) - CHAT_CARD_HISTORY)]:
+        message.pop("resumes")
+
+def display_resumes(resumes: List[Dict[str, Any]], minio_service: MinioClientService, key_prefix: str = "", truncated: bool = False) -> None:
+    """Display resume results with enhanced formatting (key_prefix keeps widget keys unique per chat message)"""
     if not resumes:
         st.warning("🔍 No resumes found matching your criteria.")
         return
                         
     
-    st.success(f"✅ Found {len(resumes)} matching candidate(s)")
+    if truncated:
+        st.success(f"✅ Showing the {len(resumes)} most relevant matching candidates")
+        st.caption("More candidates match this question; add criteria to narrow the list.")
+    else:
+        st.success(f"✅ Found {len(resumes)} matching candidate(s)")
     
     # Create columns for better layout
     for i, resume in enumerate(resumes):
@@ -134,6 +184,8 @@ def display_resumes(resumes: List[Dict[str, Any]], minio_service: MinioClientSer
             with col1:
                 # Candidate header with better styling
                 st.markdown(f"### 👤 {resume.get('full_name', 'Unknown')} #{resume['_id']}")
+                if resume.get('relevance') is not None:
+                    st.caption(f"Rank {i + 1} · relevance {resume['relevance']:.2f}")
                 
                 # Summary
                 if resume.get('summary'):
@@ -153,27 +205,44 @@ def display_resumes(resumes: List[Dict[str, Any]], minio_service: MinioClientSer
                 if resume.get('job_offer'):
                     st.markdown(f"**💼 Job Offer:** {resume['job_offer']}")
                 if resume.get('job_offer_date'):
-                    st.markdown(f"**📅 Job Offer Date:** {resume['job_offer_date']}")
+                    st.markdown(f"**📅 Job Offer Date:** {as_date(resume['job_offer_date'])}")
             
             with col2:
-                # Enhanced download button
+                # The CV is only downloaded from MinIO once the recruiter asks for it
+                card_key = f"{key_prefix}_{resume['_id']}"
                 try:
-                    pdf = minio_service.download_file(resume["minio_file_name"])
-                    pdf_data = pdf.read()
-                    
-                    st.download_button(
-                        label="📥 Download CV",
-                        data=pdf_data,
-                        file_name=f"{resume.get('full_name', 'candidate')}_{resume['_id']}.pdf",
-                        mime='application/pdf',
-                        key=f"download_{resume['_id']}",
-                        use_container_width=True,
-                        type="primary"
-                    )
-                    
-                    # File size info
-                    file_size = len(pdf_data) / 1024  # KB
-                    st.caption(f"📄 Size: {file_size:.1f} KB")
+                    if minio_service.presigned_downloads:
+                        # The browser fetches the PDF from MinIO, nothing goes through the app
+                        st.link_button(
+                            "📥 Download CV",
+                            minio_service.get_presigned_url(
+                                resume["minio_file_name"],
+                                download_name=f"{resume.get('full_name', 'candidate')}_{resume['_id']}.pdf"
+                            ),
+                            use_container_width=True,
+                            type="primary"
+                        )
+                    elif st.session_state.get(f"cv_ready_{card_key}") or st.button(
+                        "📄 Get CV",
+                        key=f"prepare_{card_key}",
+                        use_container_width=True
+                    ):
+                        st.session_state[f"cv_ready_{card_key}"] = True
+                        pdf_data = minio_service.get_file_bytes(resume["minio_file_name"])
+                        
+                        st.download_button(
+                            label="📥 Download CV",
+                            data=pdf_data,
+                            file_name=f"{resume.get('full_name', 'candidate')}_{resume['_id']}.pdf",
+                            mime='application/pdf',
+                            key=f"download_{card_key}",
+                            use_container_width=True,
+                            type="primary"
+                        )
+                        
+                        # File size info
+                        file_size = len(pdf_data) / 1024  # KB
+                        st.caption(f"📄 Size: {file_size:.1f} KB")
                     
                 except Exception as e:
                     logger.error(f"Failed to prepare download for {resume['_id']}: {e}")
@@ -285,8 +354,8 @@ def display_enhanced_sidebar(user_messages_count: int):
         st.markdown("#### 🤖 AI Model Selection")
         llm_choice = st.radio(
             "llm_choice",
-            ("Groq API llama3.3_70B", "llama3.2 3B(local)"),
-            help="Select the language model for query processing",
+            ("Auto (Groq, local fallback)", "Groq API llama3.3_70B", "llama3.2 3B(local)"),
+            help="Select the language model for query processing. Auto switches to the local model when Groq is down or slow",
             key="llm_choice",
             
         )
@@ -361,6 +430,15 @@ def display_enhanced_sidebar(user_messages_count: int):
             col1, col2 = st.columns(2)
             with col1:
                 st.metric("Questions", user_messages_count, delta=None)
+            with col2:
+                cache_stats = get_llm_response_cache().stats()
+                st.metric("LLM Cache Hits", f"{cache_stats['hit_rate']*100:.0f}%", help=f"{cache_stats['hits']} hits / {cache_stats['misses']} misses")
+            fast_stats = fast_path_stats()
+            st.metric(
+                "Answered Without AI",
+                f"{fast_stats['hit_rate']*100:.0f}%",
+                help=f"{fast_stats['hits']} of {fast_stats['attempts']} questions compiled by the rule-based fast path"
+            )
         
             st.divider()
         
@@ -387,7 +465,9 @@ def display_enhanced_sidebar(user_messages_count: int):
 def ChatPage():
     """Main chat page function"""
     # Initialize clients
-    ollama_client, groq_client, mongo_collection, minio_service, dict_skills = initialize_clients()
+    ollama_client, groq_client, auto_client, mongo_collection, minio_service, dict_skills = initialize_clients()
+    # Skills added by uploads since startup must reach the prompt, and invalidate cached queries
+    dict_skills = get_skills_mongo()
     
     # Initialize session state
     if "messages" not in st.session_state:
@@ -417,14 +497,17 @@ def ChatPage():
         """, unsafe_allow_html=True)
     
     # Select LLM client
-    llm_client = groq_client if llm_choice == "Groq API llama3.3_70B" else ollama_client
+    llm_client = {
+        "Auto (Groq, local fallback)": auto_client,
+        "Groq API llama3.3_70B": groq_client,
+    }.get(llm_choice, ollama_client)
     
     # Chat container with enhanced styling
     if has_user_messages:
         st.markdown('<div class="chat-container">', unsafe_allow_html=True)
     
     # Display chat history
-    for message in st.session_state.messages:
+    for message_index, message in enumerate(st.session_state.messages):
         with st.chat_message(message["role"]):
             if message["role"] == "user":
                 st.write(message["content"])
@@ -433,9 +516,12 @@ def ChatPage():
                 st.write("**🔍 Generated Query:**")
                 display_query_info(message["content"])
                 
-                if "resumes" in message:
-                    logger.debug(f"Displaying {len(message['resumes'])} saved resumes")
-                    display_resumes(message["resumes"], minio_service)
+                if "resume_ids" in message:
+                    cards = message.get("resumes")
+                    if cards is None:
+                        cards = load_cards(mongo_collection, message["resume_ids"])
+                    logger.debug(f"Displaying {len(cards)} saved resumes")
+                    display_resumes(cards, minio_service, key_prefix=f"msg{message_index}", truncated=message.get("truncated", False))
     
     if has_user_messages:
         st.markdown('</div>', unsafe_allow_html=True)
@@ -478,53 +564,58 @@ def process_question(question: str, llm_client, mongo_collection, minio_service,
         try:
             with st.spinner("🔄 Processing your query..."):
                 # Generate MongoDB query
-                query = text_to_mongo_query(question, llm_client, dict_skills)
+                query, query_source = question_to_mongo_query(question, llm_client, dict_skills)
                 
-                st.write("**🔍 Generated Query:**")
+                source_notes = {"rules": " *(built without AI)*", "cache": " *(reused from a similar question)*"}
+                st.write("**🔍 Generated Query:**" + source_notes.get(query_source, ""))
                 display_query_info(query)
                 
+                # Sidebar filters are pushed into the MongoDB query
+                selected_job_offer = st.session_state.get('selected_job_offer')
+                if selected_job_offer == "All Job Offers":
+                    selected_job_offer = None
+                start_date = st.session_state.get('chat_start_date') if selected_job_offer else None
+                end_date = st.session_state.get('chat_end_date') if selected_job_offer else None
+                sidebar_filter = job_offer_filter(selected_job_offer, start_date, end_date)
+                
                 # Execute query and get resumes
-                resumes = query_to_resume(query, mongo_collection)
-                resumes_list = list(resumes)
+                resumes = query_to_resume(
+                    query, mongo_collection, extra_filter=sidebar_filter,
+                    projection=CARD_PROJECTION, limit=CHAT_MAX_RESULTS + 1
+                )
+                resumes_list = [to_card(resume) for resume in resumes]
+                truncated = len(resumes_list) > CHAT_MAX_RESULTS
+                resumes_list = resumes_list[:CHAT_MAX_RESULTS]
                 
-                # Apply job offer filter if selected
-                if st.session_state.get('selected_job_offer') and st.session_state.get('selected_job_offer') != "All Job Offers":
-                    resumes_list = [r for r in resumes_list if r.get('job_offer') == st.session_state.get('selected_job_offer')]
-                    
-                    # Apply date filtering if dates are specified
-                    if st.session_state.get('chat_start_date') and st.session_state.get('chat_end_date'):
-                        date_filtered_resumes = []
-                        for r in resumes_list:
-                            if r.get('job_offer_date'):
-                                try:
-                                    job_date = datetime.fromisoformat(r["job_offer_date"]).date()
-                                    if (st.session_state.get('chat_start_date') <= job_date <= 
-                                        st.session_state.get('chat_end_date')):
-                                        date_filtered_resumes.append(r)
-                                except (ValueError, TypeError):
-                                    continue
-                        resumes_list = date_filtered_resumes
-                        st.info(f"🔍 Filtered by job offer: {st.session_state.get('selected_job_offer')} and date range ({len(resumes_list)} candidates)")
+                if selected_job_offer:
+                    if start_date and end_date:
+                        st.info(f"🔍 Filtered by job offer: {selected_job_offer} and date range ({len(resumes_list)} candidates)")
                     else:
-                        st.info(f"🔍 Filtered by job offer: {st.session_state.get('selected_job_offer')} ({len(resumes_list)} candidates)")
+                        st.info(f"🔍 Filtered by job offer: {selected_job_offer} ({len(resumes_list)} candidates)")
                     
                     if not resumes_list:
-                        st.warning(f"⚠️ No candidates found for job offer: {st.session_state.get('selected_job_offer')}")
+                        st.warning(f"⚠️ No candidates found for job offer: {selected_job_offer}")
                 
             
                 
                 # Display results
-                display_resumes(resumes_list, minio_service)
+                display_resumes(resumes_list, minio_service, key_prefix=f"msg{len(st.session_state.messages)}", truncated=truncated)
                 
-                # Add assistant message to history
+                # Add assistant message to history: candidate ids, plus cards for the most recent answers
                 st.session_state.messages.append({
                     "role": "assistant",
                     "content": query,
-                    "resumes": resumes_list
+                    "resume_ids": [resume["_id"] for resume in resumes_list],
+                    "resumes": resumes_list,
+                    "truncated": truncated
                 })
+                compact_history(st.session_state.messages)
                 
                 logger.info(f"Query processed successfully. Found {len(resumes_list)} results.")
                 
+        except UnsafeQueryError as e:
+            logger.warning(f"Query refused by the guard: {e}")
+            st.warning(f"⚠️ This search was not run: {e}. Try rephrasing it with more specific criteria.")
         except Exception as e:
             logger.error(f"Error processing query: {e}")
             st.error(f"❌ An error occurred while processing your query: {str(e)}")
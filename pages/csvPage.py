@@ -2,6 +2,7 @@ import streamlit as st
 import json
 import pandas as pd
 from clients.mongo_client import mongo_candidat_init
+from utils import as_date
 
 def CsvPage():
 
@@ -68,17 +69,12 @@ def CsvPage():
         
         # Apply date filtering if job offer is selected and dates are specified
         if selected_job_offer != "All Job Offers" and start_date and end_date:
-            from datetime import datetime
             # Filter by date range
             date_filtered_candidates = []
             for c in filtered_candidates:
-                if c.get("job_offer_date"):
-                    try:
-                        job_date = datetime.fromisoformat(c["job_offer_date"]).date()
-                        if start_date <= job_date <= end_date:
-                            date_filtered_candidates.append(c)
-                    except (ValueError, TypeError):
-                        continue
+                job_date = as_date(c.get("job_offer_date"))
+                if job_date and start_date <= job_date <= end_date:
+                    date_filtered_candidates.append(c)
             filtered_candidates = date_filtered_candidates
         
 
@@ -90,7 +86,7 @@ def CsvPage():
             "Email": c.get("email", ""),
             "Phone": c.get("phone", ""),
             "Job Offer": c.get("job_offer", "No Job Offer"),
-            "Job Offer Date": c.get("job_offer_date", ""),
+            "Job Offer Date": as_date(c.get("job_offer_date")) or "",
             "Current Role": c.get("current_role_experience", {}).get("role", ""),
             "Current Exp (yrs)": c.get("current_role_experience", {}).get("years_experience", ""),
             "Summary": (c.get("summary","") or ""),
@@ -123,7 +119,7 @@ def CsvPage():
             st.markdown(f"**Email**: {candidate.get('email', '')}")
             st.markdown(f"**Phone**: {candidate.get('phone', '')}")
             st.markdown(f"**Job Offer**: {candidate.get('job_offer', 'No Job Offer')}")
-            st.markdown(f"**Job Offer Date**: {candidate.get('job_offer_date', '')}")
+            st.markdown(f"**Job Offer Date**: {as_date(candidate.get('job_offer_date')) or ''}")
             st.markdown(f"**Summary**:{candidate.get("summary","")}")
             st.markdown(f"**Current Role**: {candidate.get('current_role_experience', {}).get('role', '')}")
             st.markdown(f"**Years in Current Role**: {candidate.get('current_role_experience', {}).get('years_experience', '')}")
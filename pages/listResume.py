@@ -1,32 +1,41 @@
 import streamlit as st
 import base64
-from clients.mongo_client import mongo_candidat_init, get_skills_mongo
+from clients.mongo_client import mongo_candidat_init, get_skills_mongo, build_candidate_filter, find_candidates_page, get_job_offer_counts
 from clients.minio_client import MinioClientService
+from utils import as_date
 # Example list of PDFs with metadata
 from streamlit_pdf_viewer import pdf_viewer
 
+PAGE_SIZE = 10
+
+# Only the fields rendered on a resume card are fetched
+LIST_PROJECTION = {
+    "full_name": 1,
+    "summary": 1,
+    "roles_experience.role": 1,
+    "roles_experience.years_experience": 1,
+    "job_offer": 1,
+    "job_offer_date": 1,
+    "minio_file_name": 1,
+    "is_mock": 1,
+}
+
 def listResume():
     st.title("📚 Resume Library")
 
     collection = mongo_candidat_init()
     minio = MinioClientService()
-    if "resumes" not in st.session_state:
-        st.session_state.resumes = list(collection.find())
     
     st.title("📄 Candidate Table with PDF Preview")
     
-    # Dashboard: number of candidates per job offer
+    # Dashboard: number of candidates per job offer (aggregated in MongoDB)
     try:
-        offer_counts = {}
-        for c in st.session_state.resumes:
-            offer = c.get("job_offer")
-            if offer:
-                offer_counts[offer] = offer_counts.get(offer, 0) + 1
+        offer_counts = get_job_offer_counts()
 
         st.markdown("### 📊 Job Offer Dashboard")
         cols = st.columns(3)
         with cols[0]:
-            st.metric("Total Candidates", len(st.session_state.resumes))
+            st.metric("Total Candidates", collection.estimated_document_count())
         with cols[1]:
             st.metric("Job Offers", len(offer_counts))
         with cols[2]:
@@ -52,10 +61,11 @@ def listResume():
                 
             except Exception:
                 # Fallback to a simple table
-                st.write({k: offer_counts[k] for k in sorted(offer_counts, key=offer_counts.get, reverse=True)})
+                st.write(offer_counts)
         else:
             st.info("No job offers found among candidates.")
     except Exception as e:
+        offer_counts = {}
         st.warning(f"Could not build dashboard: {e}")
     
     # Search and filter section
@@ -89,7 +99,7 @@ def listResume():
     
     with col2:
         # Job offer filter
-        job_offers = ["All Job Offers"] + list(set([c.get("job_offer", "No Job Offer") for c in st.session_state.resumes if c.get("job_offer")]))
+        job_offers = ["All Job Offers"] + sorted(offer_counts)
         selected_job_offer = st.selectbox("💼 Filter by Job Offer:", job_offers)
         
         # Date range filter for job offers
@@ -113,71 +123,29 @@ def listResume():
             start_date = None
             end_date = None
 
-    resumes = st.session_state.resumes
-    filtered_resumes = []
-    for c in resumes:
-        # Name filter
-        name_match = True
-        if name_filter:
-            name_match = name_filter in (c.get("full_name") or "").lower()
-
-        # Email filter (contains)
-        email_match = True
-        if email_filter:
-            if isinstance(c.get("email"), list):
-                email_match = any(email_filter in (e or "").lower() for e in c["email"])
-            else:
-                email_match = email_filter in (c.get("email") or "").lower()
-
-        # Role filter
-        role_match = True
-        if role_filter:
-            role_match = role_filter in (c.get("current_role_experience", {}).get("role", "") or "").lower()
-
-        # Summary keyword filter
-        summary_match = True
-        if summary_filter:
-            summary_match = summary_filter in (c.get("summary") or "").lower()
-
-        # Job offer filter
-        job_offer_match = (selected_job_offer == "All Job Offers" or c.get("job_offer") == selected_job_offer)
-
-        # Skills filter
-        skills_match = True
-        if selected_skills:
-            # Extract techs from candidate
-            candidate_techs = []
-            try:
-                for s in c.get("skills", []):
-                    tech = (s.get("technology") or "").strip().lower()
-                    if tech:
-                        candidate_techs.append(tech)
-            except Exception:
-                candidate_techs = []
-
-            selected_skills_norm = [s.strip().lower() for s in selected_skills]
-            if skill_match_mode == "All":
-                skills_match = all(s in candidate_techs for s in selected_skills_norm)
-            else:
-                skills_match = any(s in candidate_techs for s in selected_skills_norm)
-
-        if name_match and email_match and role_match and summary_match and job_offer_match and skills_match:
-            filtered_resumes.append(c)
-    
-    # Apply date filtering if job offer is selected and dates are specified
-    if selected_job_offer != "All Job Offers" and start_date and end_date:
-        from datetime import datetime
-        # Filter by date range
-        date_filtered_resumes = []
-        for c in filtered_resumes:
-            if c.get("job_offer_date"):
-                try:
-                    job_date = datetime.fromisoformat(c["job_offer_date"]).date()
-                    if start_date <= job_date <= end_date:
-                        date_filtered_resumes.append(c)
-                except (ValueError, TypeError):
-                    continue
-        filtered_resumes = date_filtered_resumes
+    query = build_candidate_filter(
+        name=name_filter,
+        role=role_filter,
+        email=email_filter,
+        summary=summary_filter,
+        skills=selected_skills,
+        skill_match_mode=skill_match_mode,
+        job_offer=None if selected_job_offer == "All Job Offers" else selected_job_offer,
+        start_date=start_date,
+        end_date=end_date,
+    )
+
+    # Cursor-based pagination: remember where each visited page starts, reset when filters change
+    query_key = repr(query)
+    if st.session_state.get("list_query_key") != query_key:
+        st.session_state.list_query_key = query_key
+        st.session_state.list_page_starts = [None]
+    page_starts = st.session_state.list_page_starts
+
+    page_resumes, has_next_page = find_candidates_page(
+        query, LIST_PROJECTION, page_size=PAGE_SIZE, after_id=page_starts[-1]
+    )
+    result_count = collection.count_documents(query) if query else collection.estimated_document_count()
 
     # Notify when filters are applied
     active_filters = []
@@ -198,14 +166,16 @@ def listResume():
             active_filters.append(f"Date: {start_date} → {end_date}")
 
     if active_filters:
-        msg = " | ".join(active_filters) + f"  •  {len(filtered_resumes)} result(s)"
+        msg = " | ".join(active_filters) + f"  •  {result_count} result(s)"
         toast_fn = getattr(st, "toast", None)
         if callable(toast_fn):
             toast_fn(msg)
         else:
             st.info(msg)
 
-    for index, pdf_info in enumerate(filtered_resumes):
+    st.caption(f"Page {len(page_starts)} • {result_count} candidate(s)")
+
+    for index, pdf_info in enumerate(page_resumes):
         # Load PDF
         # Metadata display
         max_experience = max(pdf_info['roles_experience'], key=lambda x: x.get('years_experience', 0)) if pdf_info.get('roles_experience') else {"role": "", "years_experience": 0}
@@ -217,24 +187,46 @@ def listResume():
         if pdf_info.get('job_offer'):
             st.write(f"**💼 Job Offer:** {pdf_info['job_offer']}")
         if pdf_info.get('job_offer_date'):
-            st.write(f"**📅 Job Offer Date:** {pdf_info['job_offer_date']}")
+            st.write(f"**📅 Job Offer Date:** {as_date(pdf_info['job_offer_date'])}")
 
-        # PDF preview and download (skip for mock rows without files)
+        # PDF preview and download, fetched only when asked for (skip for mock rows without files)
         if not pdf_info.get("is_mock") and pdf_info.get("minio_file_name"):
             try:
-                pdf = minio.download_file(pdf_info["minio_file_name"])
-                pdf_data = pdf.read()
-                pdf_viewer(pdf_data, height=350)
-                st.download_button(
-                    label="📥 Download PDF",
-                    data=pdf_data,
-                    file_name=f"{pdf_info['full_name']}_{pdf_info['_id']}.pdf",
-                    mime='application/pdf',
-                    key=f"download_button_{index}"
-                )
+                card_key = str(pdf_info["_id"])
+                if st.toggle("👁️ Preview PDF", key=f"preview_{card_key}"):
+                    pdf_viewer(minio.get_file_bytes(pdf_info["minio_file_name"]), height=350)
+                
+                if minio.presigned_downloads:
+                    st.link_button(
+                        "📥 Download PDF",
+                        minio.get_presigned_url(
+                            pdf_info["minio_file_name"],
+                            download_name=f"{pdf_info['full_name']}_{pdf_info['_id']}.pdf"
+                        )
+                    )
+                elif st.session_state.get(f"download_ready_{card_key}") or st.button("📄 Prepare download", key=f"prepare_download_{card_key}"):
+                    st.session_state[f"download_ready_{card_key}"] = True
+                    st.download_button(
+                        label="📥 Download PDF",
+                        data=minio.get_file_bytes(pdf_info["minio_file_name"]),
+                        file_name=f"{pdf_info['full_name']}_{pdf_info['_id']}.pdf",
+                        mime='application/pdf',
+                        key=f"download_button_{card_key}"
+                    )
             except Exception:
                 st.caption("PDF preview unavailable.")
         else:
             st.caption("Preview mode: PDF not available for mock data.")
 
         st.markdown("---")
+
+    # Page navigation
+    nav_prev, nav_next = st.columns(2)
+    with nav_prev:
+        if len(page_starts) > 1 and st.button("⬅️ Previous page", use_container_width=True):
+            page_starts.pop()
+            st.rerun()
+    with nav_next:
+        if has_next_page and st.button("Next page ➡️", use_container_width=True):
+            page_starts.append(page_resumes[-1]["_id"])
+            st.rerun()
@@ -430,17 +430,16 @@ def SkillsManagementPage():
                         # Get current skills from MongoDB
                         mongo_skills = get_skills_mongo()
                         
-                        # Clear and re-add to ChromaDB
+                        # Make ChromaDB match MongoDB: one bulk delete, one bulk insert
                         if mongo_skills:
-                            # Remove all from ChromaDB first
-                            chroma_skills = get_all_skills_chroma()
-                            if chroma_skills:
-                                remove_skills_chroma(chroma_skills)
+                            mongo_set = set(mongo_skills)
+                            extra_skills = [s for s in get_all_skills_chroma() if s not in mongo_set]
+                            if extra_skills:
+                                remove_skills_chroma(extra_skills)
                             
-                            # Re-add all from MongoDB
-                            add_unique_skills_to_chroma(mongo_skills)
+                            added_skills = add_unique_skills_to_chroma(mongo_skills)
                             
-                            st.success(f"✅ Forced sync completed! Both databases now contain {len(mongo_skills)} skills")
+                            st.success(f"✅ Forced sync completed! Both databases now contain {len(mongo_skills)} skills ({len(added_skills)} added, {len(extra_skills)} removed from ChromaDB)")
                             st.rerun()
                         else:
                             st.warning("No skills in MongoDB to sync")
@@ -1,18 +1,17 @@
 import streamlit as st
-import json
-import os
-import tempfile
 from typing import List, Dict, Any, Optional
-from datetime import datetime
 
-from utils import extract_resume_text
-from clients.mongo_client import mongo_candidat_init, check_mongo_duplicate
+from clients.mongo_client import mongo_candidat_init
+from utils import as_date
 import logging
 from llms.ollamaClient import OllamaClient
-from llms.groqClient import GroqClient
-from services.llm_service import resume_to_json
+from llms.cachedClient import CachedLLMClient
+from llms.routingClient import RoutingLLMClient
+from llms.groqClient import GroqClient, get_groq_rate_limiter
 from clients.minio_client import MinioClientService
-from services.dictionaire_service import add_skill_if_new_and_replace_similar_ones, get_skills_mongo
+from services.dictionaire_service import get_skills_mongo
+from services.ingestion_service import ingest_resumes, DEFAULT_MAX_WORKERS, DEFAULT_MAX_LLM_CALLS, DUPLICATE_REJECT, DUPLICATE_MERGE
+from services.job_queue import enqueue_job, get_jobs, TERMINAL_STATES, STATE_STORED, STATE_FAILED
 
 # Configure logging
 logging.basicConfig(
@@ -21,6 +20,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+JOB_STATUS_REFRESH_SECONDS = 3
+JOB_STATE_LABELS = {
+    "queued": "⏳ Waiting for a worker",
+    "extracting": "📄 Extracting text",
+    "llm": "🤖 AI extraction",
+    "skills": "🛠️ Matching skills",
+    STATE_STORED: "✅ Done",
+    STATE_FAILED: "❌ Failed",
+}
+
 # Custom CSS for enhanced styling
 st.markdown("""
 <style>
@@ -108,40 +117,23 @@ st.markdown("""
 def initialize_services():
     """Initialize and cache service connections"""
     try:
-        ollama_client = OllamaClient()
-        groq_client = GroqClient()
+        ollama = OllamaClient()
+        groq = GroqClient()
+        ollama_client = CachedLLMClient(ollama)
+        groq_client = CachedLLMClient(groq)
+        # Groq first, the local model takes over when Groq is failing or slower than usual
+        auto_client = CachedLLMClient(RoutingLLMClient([groq, ollama]))
         minio_client = MinioClientService()
         collection = mongo_candidat_init()
         existing_skills = get_skills_mongo()
         
         logger.info("All services initialized successfully")
-        return ollama_client, groq_client, minio_client, collection, existing_skills
+        return ollama_client, groq_client, auto_client, minio_client, collection, existing_skills
     except Exception as e:
         logger.error(f"Failed to initialize services: {e}")
         st.error(f"Failed to initialize services: {e}")
         st.stop()
 
-def save_uploaded_file_secure(uploaded_file) -> str:
-    """Securely save uploaded file using temporary directory"""
-    try:
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{uploaded_file.name}") as tmp_file:
-            tmp_file.write(uploaded_file.getbuffer())
-            return tmp_file.name
-    except Exception as e:
-        logger.error(f"Error saving uploaded file: {e}")
-        raise
-
-def validate_extracted_data(extracted_data: Dict[str, Any]) -> bool:
-    """Validate extracted resume data"""
-    required_fields = ['email', 'full_name']
-    
-    for field in required_fields:
-        if field not in extracted_data or not extracted_data[field]:
-            return False
-    
-    return True
-
 def display_extraction_preview(extracted_data: Dict[str, Any]) -> None:
     """Display a preview of extracted data"""
     if "error" in extracted_data:
@@ -177,106 +169,6 @@ def display_extraction_preview(extracted_data: Dict[str, Any]) -> None:
                     skills_html += f'<span class="feature-badge">{skill}</span> '
                 st.markdown(skills_html, unsafe_allow_html=True)
 
-def process_single_file(uploaded_file, llm_client, collection, minio_client, existing_skills, job_offer="", job_offer_date=None, skill_strategy: str = "llm") -> Dict[str, Any]:
-    """Process a single uploaded resume file"""
-    result = {
-        "success": False,
-        "message": "",
-        "data": None,
-        "filename": uploaded_file.name
-    }
-    
-    file_path = None
-    
-    try:
-        # Save file securely
-        file_path = save_uploaded_file_secure(uploaded_file)
-        
-        # Extract text from resume
-        with st.spinner("📄 Extracting text from PDF..."):
-            resume_text = extract_resume_text(file_path)
-            
-        if not resume_text.strip():
-            result["message"] = "❌ No text could be extracted from the PDF"
-            return result
-        
-        # Extract structured data using LLM
-        with st.spinner("🤖 Analyzing resume with AI..."):
-            cleaned_json = resume_to_json(resume_text, llm_client)
-            
-        # Parse JSON response
-        try:
-            extracted_data = json.loads(cleaned_json)
-            
-            # Add current role experience
-            if 'roles_experience' in extracted_data and extracted_data['roles_experience']:
-                extracted_data["current_role_experience"] = max(
-                    extracted_data['roles_experience'], 
-                    key=lambda r: r.get('years_experience', 0)
-                )
-            
-        except json.JSONDecodeError as e:
-            result["message"] = f"❌ Invalid JSON response from AI model: {str(e)}"
-            result["data"] = {"error": "Invalid JSON", "raw_output": cleaned_json}
-            return result
-        
-        # Validate extracted data
-        if not validate_extracted_data(extracted_data):
-            result["message"] = "❌ Missing required fields (name or email)"
-            return result
-        
-        # Check for duplicates
-        # keep the old one
-        # if check_mongo_duplicate(email=extracted_data["email"], full_name=extracted_data["full_name"]):
-        #     result["message"] = f"⚠️ Resume Already exists: {extracted_data['email']} or {extracted_data['full_name']} already exists. Replacing with the new one "
-        #     result["data"] = extracted_data
-        #     return result
-        
-        # Process skills
-        with st.spinner("🔍 Processing skills and matching..."):
-            logger.debug(f"Extracted data BEFORE similarity replace: {extracted_data}")
-            add_skill_if_new_and_replace_similar_ones(
-                extracted_data,
-                existing_skills_set=existing_skills,
-                strategy_name=skill_strategy,
-                llm_client=llm_client
-            )
-            logger.debug(f"Extracted data AFTER similarity replace: {extracted_data}")
-        
-        # Upload to MinIO and save to MongoDB
-        with st.spinner("💾 Saving to database..."):
-            minio_filename = minio_client.upload_file(uploaded_file)
-            extracted_data["minio_file_name"] = minio_filename
-            extracted_data["upload_timestamp"] = datetime.now() 
-            
-            # Add job offer information
-            if job_offer:
-                extracted_data["job_offer"] = job_offer
-            if job_offer_date:
-                extracted_data["job_offer_date"] = job_offer_date.isoformat()
-            
-            collection.insert_one(extracted_data)
-        
-        result["success"] = True
-        result["message"] = "✅ Resume processed and saved successfully!"
-        result["data"] = extracted_data
-        
-        logger.info(f"Successfully processed {uploaded_file.name}")
-        
-    except Exception as e:
-        logger.exception(f"Error processing {uploaded_file.name}: {e}")
-        result["message"] = f"❌ Error processing file: {str(e)}"
-        
-    finally:
-        # Clean up temporary file
-        if file_path and os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except Exception as e:
-                logger.warning(f"Could not remove temporary file {file_path}: {e}")
-    
-    return result
-
 def display_upload_instructions():
     """Display upload instructions and tips"""
     st.markdown("""
@@ -317,7 +209,7 @@ def UploadPage():
     )
     
     # Initialize services
-    ollama_client, groq_client, minio_client, collection, existing_skills = initialize_services()
+    ollama_client, groq_client, auto_client, minio_client, collection, existing_skills = initialize_services()
     
     # Initialize session state
     if 'processed_files' not in st.session_state:
@@ -326,6 +218,10 @@ def UploadPage():
     if 'processing_results' not in st.session_state:
         st.session_state.processing_results = []
     
+    if 'queued_jobs' not in st.session_state:
+        st.session_state.queued_jobs = []
+        st.session_state.jobs_active = False
+    
     # Header
     st.markdown('<h1 class="upload-header">📄 Resume Extractor & Analyzer</h1>', unsafe_allow_html=True)
     st.markdown('<p class="subtitle">AI-Powered Resume Processing with Advanced Data Extraction</p>', unsafe_allow_html=True)
@@ -337,12 +233,16 @@ def UploadPage():
         # LLM selection
         llm_choice = st.radio(
             "Choose AI Model:",
-            ("Groq API llama3.3_70B", "llama3.2 3B(local)"),
-            help="Select the AI model for resume analysis"
+            ("Auto (Groq, local fallback)", "Groq API llama3.3_70B", "llama3.2 3B(local)"),
+            help="Select the AI model for resume analysis. Auto switches to the local model when Groq is down or slow"
         )
         
         # Set LLM client
-        llm_client = groq_client if llm_choice == "Groq API llama3.3_70B" else ollama_client
+        llm_backend = {
+            "Auto (Groq, local fallback)": "auto",
+            "Groq API llama3.3_70B": "groq",
+        }.get(llm_choice, "ollama")
+        llm_client = {"auto": auto_client, "groq": groq_client, "ollama": ollama_client}[llm_backend]
         st.session_state.llm_client = llm_client
         
         st.divider()
@@ -359,6 +259,31 @@ def UploadPage():
         # Processing options
         st.markdown("### 🔧 Processing Options")
         show_preview = st.checkbox("Show data preview", value=True, help="Display extracted data preview")
+        processing_mode = st.radio(
+            "Processing mode:",
+            ("Background queue", "In this session"),
+            help="Queued resumes are processed by `python worker.py` and keep going if this page is closed or reloaded"
+        )
+        max_workers = st.slider(
+            "Parallel files:",
+            min_value=1,
+            max_value=16,
+            value=DEFAULT_MAX_WORKERS,
+            help="Number of resumes processed at the same time"
+        )
+        max_llm_calls = st.slider(
+            "Concurrent AI requests:",
+            min_value=1,
+            max_value=max_workers,
+            value=min(DEFAULT_MAX_LLM_CALLS, max_workers),
+            help="Upper bound on in-flight LLM calls, to stay within provider rate limits"
+        )
+        duplicate_choice = st.radio(
+            "Already stored resumes:",
+            ("Skip", "Update job offer"),
+            help="Identical files or resumes with the same text are detected before any AI processing"
+        )
+        duplicate_policy = DUPLICATE_MERGE if duplicate_choice == "Update job offer" else DUPLICATE_REJECT
         
         # Job offer selection
         st.markdown("### 💼 Job Offer Assignment")
@@ -399,13 +324,9 @@ def UploadPage():
                 formatted_options = []
                 for doc in existing_job_offers_data:
                     count = doc["count"]
-                    latest_date = doc["latest_date"]
+                    latest_date = as_date(doc["latest_date"])
                     if latest_date:
-                        try:
-                            date_obj = datetime.fromisoformat(latest_date).strftime("%Y-%m-%d")
-                            formatted_options.append(f"{doc['_id']} ({count} candidates, latest: {date_obj})")
-                        except (ValueError, TypeError):
-                            formatted_options.append(f"{doc['_id']} ({count} candidates)")
+                        formatted_options.append(f"{doc['_id']} ({count} candidates, latest: {latest_date.strftime('%Y-%m-%d')})")
                     else:
                         formatted_options.append(f"{doc['_id']} ({count} candidates)")
                 
@@ -447,12 +368,9 @@ def UploadPage():
             selected_job_data = next((doc for doc in existing_job_offers_data if doc["_id"] == job_offer), None)
             if selected_job_data:
                 st.info(f"📊 **Job Offer Info:** {selected_job_data['count']} candidates already exist for this position")
-                if selected_job_data.get('latest_date'):
-                    try:
-                        latest_date_obj = datetime.fromisoformat(selected_job_data['latest_date']).date()
-                        st.info(f"📅 **Latest Application:** {latest_date_obj.strftime('%B %d, %Y')}")
-                    except (ValueError, TypeError):
-                        pass
+                latest_date_obj = as_date(selected_job_data.get('latest_date'))
+                if latest_date_obj:
+                    st.info(f"📅 **Latest Application:** {latest_date_obj.strftime('%B %d, %Y')}")
         
         # Add "All Job Offers" option
         if st.button("📋 View All Job Offers", use_container_width=True):
@@ -470,11 +388,22 @@ def UploadPage():
             st.metric("Files Processed", total_files)
             st.metric("Successful", successful_files)
             st.metric("Success Rate", f"{(successful_files/total_files)*100:.1f}%" if total_files > 0 else "0%")
+            
+            # Only the in-session path throttles here; the background worker has its own limiter
+            rate_stats = get_groq_rate_limiter().stats()
+            if rate_stats["throttled_requests"] or rate_stats["rate_limited"]:
+                st.metric(
+                    "Groq Throttling",
+                    f"{rate_stats['throttled_seconds']:.0f}s",
+                    help=f"{rate_stats['throttled_requests']} request(s) delayed to stay within GROQ_RPM / GROQ_TPM, {rate_stats['rate_limited']} rate-limit response(s) from Groq"
+                )
         
         # Clear session button
         if st.button("🗑️ Clear Session", use_container_width=True):
             st.session_state.processed_files = set()
             st.session_state.processing_results = []
+            st.session_state.queued_jobs = []
+            st.session_state.jobs_active = False
             st.rerun()
     
     # Main content area
@@ -494,7 +423,15 @@ def UploadPage():
         
         # Process files
         if uploaded_files:
-            process_uploaded_files(uploaded_files, llm_client, collection, minio_client, existing_skills, show_preview, job_offer, job_offer_date, skill_strategy_value)
+            if processing_mode == "Background queue":
+                enqueue_uploaded_files(uploaded_files, minio_client, job_offer, job_offer_date, skill_strategy_value, llm_backend, duplicate_policy)
+            else:
+                process_uploaded_files(uploaded_files, llm_client, collection, minio_client, existing_skills, show_preview, job_offer, job_offer_date, skill_strategy_value, max_workers, max_llm_calls, duplicate_policy)
+        
+        # Poll the queue only while some jobs are still running
+        if st.session_state.queued_jobs:
+            refresh = JOB_STATUS_REFRESH_SECONDS if st.session_state.jobs_active else None
+            st.fragment(display_job_status, run_every=refresh)()
     
     with col2:
         # Display processing results summary
@@ -548,7 +485,7 @@ def UploadPage():
             if job_offers:
                 for offer in job_offers:
                     with st.expander(f"💼 {offer['_id']} ({offer['count']} candidates)", expanded=False):
-                        st.write(f"**Latest Application Date:** {offer['latest_date']}")
+                        st.write(f"**Latest Application Date:** {as_date(offer['latest_date'])}")
                         st.write(f"**Total Candidates:** {offer['count']}")
                         st.write("**Candidates:**")
                         for candidate in offer['candidates'][:10]:  # Show first 10
@@ -571,60 +508,138 @@ def UploadPage():
             st.session_state.show_job_offers = False
             st.rerun()
 
-def process_uploaded_files(uploaded_files: List, llm_client, collection, minio_client, existing_skills, show_preview: bool, job_offer="", job_offer_date=None, skill_strategy: str = "llm"):
-    """Process multiple uploaded files"""
+def enqueue_uploaded_files(uploaded_files: List, minio_client, job_offer="", job_offer_date=None, skill_strategy: str = "llm", llm_backend: str = "groq", duplicate_policy: str = DUPLICATE_REJECT):
+    """Queue new files for the background worker; processing continues if the page is closed"""
+    new_files = [f for f in uploaded_files if f.name not in st.session_state.processed_files]
+    if not new_files:
+        return
+    
+    queued = 0
+    with st.spinner(f"Queuing {len(new_files)} file(s)..."):
+        for uploaded_file in new_files:
+            try:
+                job_id = enqueue_job(
+                    uploaded_file,
+                    minio_client,
+                    job_offer=job_offer,
+                    job_offer_date=job_offer_date,
+                    skill_strategy=skill_strategy,
+                    llm_backend=llm_backend,
+                    duplicate_policy=duplicate_policy,
+                )
+            except Exception as e:
+                logger.error(f"Could not queue {uploaded_file.name}: {e}")
+                st.error(f"❌ {uploaded_file.name} could not be queued: {e}")
+                continue
+            st.session_state.processed_files.add(uploaded_file.name)
+            if job_id not in st.session_state.queued_jobs:
+                st.session_state.queued_jobs.append(job_id)
+            queued += 1
+    
+    if queued:
+        st.session_state.jobs_active = True
+        st.success(f"📥 {queued} file(s) queued. They are processed by the ingestion worker (`python worker.py`).")
+
+def display_job_status():
+    """Status of the jobs queued from this session, refreshed while any of them is running"""
+    jobs = get_jobs(st.session_state.queued_jobs)
+    finished = [job for job in jobs if job["state"] in TERMINAL_STATES]
+    
+    st.markdown("### 📥 Background Jobs")
+    display_processing_stats(len(finished), len(jobs), len([job for job in finished if job.get("success")]))
+    
+    for job in jobs:
+        label = JOB_STATE_LABELS.get(job["state"], job["state"])
+        if job["state"] in TERMINAL_STATES:
+            st.write(f"**📄 {job['file_name']}** — {job.get('message') or label}")
+        elif job.get("error"):
+            st.write(f"**📄 {job['file_name']}** — {label} (attempt {job['attempts'] + 1}, retrying after: {job['error']})")
+        else:
+            st.write(f"**📄 {job['file_name']}** — {label}")
+    
+    if st.button("🔄 Refresh status", key="refresh_jobs"):
+        st.rerun(scope="fragment")
+    
+    # Record finished jobs once, then stop polling with a full rerun
+    if st.session_state.jobs_active and len(finished) == len(jobs):
+        recorded = {result["filename"] for result in st.session_state.processing_results}
+        for job in finished:
+            if job["file_name"] not in recorded:
+                st.session_state.processing_results.append({
+                    "success": bool(job.get("success")),
+                    "message": job.get("message", ""),
+                    "data": None,
+                    "filename": job["file_name"],
+                })
+        st.session_state.jobs_active = False
+        st.rerun()
+
+def process_uploaded_files(uploaded_files: List, llm_client, collection, minio_client, existing_skills, show_preview: bool, job_offer="", job_offer_date=None, skill_strategy: str = "llm", max_workers: int = DEFAULT_MAX_WORKERS, max_llm_calls: int = DEFAULT_MAX_LLM_CALLS, duplicate_policy: str = DUPLICATE_REJECT):
+    """Process multiple uploaded files concurrently"""
     new_files = [f for f in uploaded_files if f.name not in st.session_state.processed_files]
     
     if not new_files:
         st.info("All selected files have already been processed in this session.")
         return
     
-    # Display processing stats
     total_files = len(new_files)
-    processed_count = 0
-    success_count = 0
+    counters = {"processed": 0, "success": 0}
     
-    # Process each file
-    for uploaded_file in new_files:
-        st.session_state.processed_files.add(uploaded_file.name)
-        
-        # Processing card
-        st.markdown(f"""
-        <div class="processing-card">
-            <h4>🔄 Processing: {uploaded_file.name}</h4>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Process the file
-        result = process_single_file(uploaded_file, llm_client, collection, minio_client, existing_skills, job_offer, job_offer_date, skill_strategy)
-        
-        # Store result
-        st.session_state.processing_results.append(result)
-        
-        # Display result
+    st.markdown(f"""
+    <div class="processing-card">
+        <h4>🔄 Processing {total_files} file(s) with {max_workers} worker(s)</h4>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    stats_placeholder = st.empty()
+    with stats_placeholder.container():
+        display_processing_stats(0, total_files, 0)
+    # One slot per file so results render in upload order even though they finish out of order
+    result_slots = [st.empty() for _ in new_files]
+    
+    def on_result(index: int, result: Dict[str, Any]) -> None:
+        counters["processed"] += 1
         if result["success"]:
-            st.success(result["message"])
-            success_count += 1
-            
-            if show_preview and result["data"]:
-                display_extraction_preview(result["data"])
-                
-        else:
-            if "Duplicate" in result["message"]:
+            counters["success"] += 1
+        
+        with result_slots[index].container():
+            st.markdown(f"**📄 {result['filename']}**")
+            if result["success"]:
+                st.success(result["message"])
+                if show_preview and result["data"]:
+                    display_extraction_preview(result["data"])
+            elif "Duplicate" in result["message"]:
                 st.warning(result["message"])
                 if show_preview and result["data"]:
                     display_extraction_preview(result["data"])
             else:
                 st.error(result["message"])
+            st.divider()
         
-        processed_count += 1
-        
-        # Update progress
-        display_processing_stats(processed_count, total_files, success_count)
-        
-        st.divider()
+        with stats_placeholder.container():
+            display_processing_stats(counters["processed"], total_files, counters["success"])
+    
+    results = ingest_resumes(
+        new_files,
+        llm_client,
+        collection,
+        minio_client,
+        existing_skills,
+        job_offer=job_offer,
+        job_offer_date=job_offer_date,
+        skill_strategy=skill_strategy,
+        duplicate_policy=duplicate_policy,
+        max_workers=max_workers,
+        max_llm_calls=max_llm_calls,
+        on_result=on_result,
+    )
+    
+    for uploaded_file, result in zip(new_files, results):
+        st.session_state.processed_files.add(uploaded_file.name)
+        st.session_state.processing_results.append(result)
     
-    # Final summary
+    processed_count = counters["processed"]
+    success_count = counters["success"]
     if processed_count > 0:
         st.markdown(f"""
         <div class="stats-container">
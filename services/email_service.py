@@ -1,4 +1,216 @@
 import imaplib
 import email
 from email.header import decode_header
-from 
\ No newline at end of file
+import os
+import re
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import dotenv
+
+from clients.mongo_client import get_skills_mongo
+from services.cache_service import CACHE_DIR
+from services.ingestion_service import ingest_resumes, DEFAULT_MAX_WORKERS, DEFAULT_MAX_LLM_CALLS, DUPLICATE_REJECT
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(levelname)s] %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+dotenv.load_dotenv()
+IMAP_HOST = os.getenv("IMAP_HOST")
+IMAP_PORT = int(os.getenv("IMAP_PORT", "993"))
+IMAP_USER = os.getenv("IMAP_USER")
+IMAP_PASSWORD = os.getenv("IMAP_PASSWORD")
+IMAP_MAILBOX = os.getenv("IMAP_MAILBOX", "INBOX")
+IMAP_BATCH_SIZE = int(os.getenv("IMAP_BATCH_SIZE", "20"))
+IMAP_POLL_SECONDS = float(os.getenv("IMAP_POLL_SECONDS", "60"))
+
+_UID_PATTERN = re.compile(rb"UID (\d+)")
+
+
+def default_imap_factory():
+    """Logged-in IMAP4_SSL connection from the IMAP_* environment variables"""
+    if not IMAP_HOST or not IMAP_USER or not IMAP_PASSWORD:
+        raise ValueError("IMAP credentials are not set in environment variables.")
+    connection = imaplib.IMAP4_SSL(IMAP_HOST, IMAP_PORT)
+    connection.login(IMAP_USER, IMAP_PASSWORD)
+    return connection
+
+
+def _decode(value: Optional[str]) -> str:
+    if not value:
+        return ""
+    decoded = []
+    for text, charset in decode_header(value):
+        if isinstance(text, bytes):
+            text = text.decode(charset or "utf-8", errors="replace")
+        decoded.append(text)
+    return "".join(decoded)
+
+
+class EmailAttachment:
+    """A PDF attachment with the file-uploader interface the ingestion service expects"""
+
+    def __init__(self, name: str, data: bytes, uid: int, sender: str):
+        self.name = name
+        self.uid = uid
+        self.sender = sender
+        self._data = data
+
+    def getvalue(self) -> bytes:
+        return self._data
+
+
+def extract_pdf_attachments(raw_message: bytes, uid: int) -> List[EmailAttachment]:
+    message = email.message_from_bytes(raw_message)
+    sender = _decode(message.get("From"))
+    attachments = []
+    for part in message.walk():
+        if part.is_multipart():
+            continue
+        filename = _decode(part.get_filename())
+        if part.get_content_type() != "application/pdf" and not filename.lower().endswith(".pdf"):
+            continue
+        data = part.get_payload(decode=True)
+        if data:
+            attachments.append(EmailAttachment(filename or f"message-{uid}.pdf", data, uid, sender))
+    return attachments
+
+
+class MailboxPoller:
+    """
+    Polls one IMAP mailbox for resumes sent as PDF attachments.
+
+    Only messages with a UID above the last one processed are fetched, in batches,
+    and the position is saved after each batch. If the mailbox's UIDVALIDITY
+    changes the stored UIDs mean nothing anymore and the mailbox is read again;
+    content fingerprints keep already stored resumes from being imported twice.
+    """
+
+    def __init__(self, llm_client, collection, minio_client,
+                 imap_factory: Callable[[], Any] = default_imap_factory,
+                 mailbox: str = IMAP_MAILBOX,
+                 state_path: Optional[str] = None,
+                 batch_size: int = IMAP_BATCH_SIZE,
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 max_llm_calls: int = DEFAULT_MAX_LLM_CALLS,
+                 skill_strategy: str = "llm",
+                 job_offer: str = "",
+                 duplicate_policy: str = DUPLICATE_REJECT):
+        self.llm_client = llm_client
+        self.collection = collection
+        self.minio_client = minio_client
+        self.imap_factory = imap_factory
+        self.mailbox = mailbox
+        self.state_path = state_path or os.path.join(CACHE_DIR, f"imap_state_{re.sub(r'[^A-Za-z0-9_-]', '_', mailbox)}.json")
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.max_llm_calls = max_llm_calls
+        self.skill_strategy = skill_strategy
+        self.job_offer = job_offer
+        self.duplicate_policy = duplicate_policy
+
+    def _load_state(self) -> Dict[str, int]:
+        if not os.path.exists(self.state_path):
+            return {"uidvalidity": 0, "last_uid": 0}
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_state(self, uidvalidity: int, last_uid: int) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"uidvalidity": uidvalidity, "last_uid": last_uid}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _fetch_batch(self, connection, uids: List[int]) -> List[EmailAttachment]:
+        # BODY.PEEK leaves the \Seen flag alone, so the mailbox still looks unread to recruiters
+        typ, data = connection.uid("FETCH", ",".join(str(uid) for uid in uids), "(UID BODY.PEEK[])")
+        if typ != "OK":
+            raise imaplib.IMAP4.error(f"FETCH failed: {data}")
+        attachments = []
+        for item in data:
+            if not isinstance(item, tuple):
+                continue
+            match = _UID_PATTERN.search(item[0])
+            uid = int(match.group(1)) if match else 0
+            attachments.extend(extract_pdf_attachments(item[1], uid))
+        return attachments
+
+    def poll_once(self) -> List[Dict[str, Any]]:
+        """Ingest the PDF attachments of every message received since the last poll"""
+        connection = self.imap_factory()
+        results = []
+        try:
+            typ, _ = connection.select(self.mailbox, readonly=True)
+            if typ != "OK":
+                raise imaplib.IMAP4.error(f"Could not select mailbox {self.mailbox}")
+            uidvalidity = int(connection.response("UIDVALIDITY")[1][0])
+
+            state = self._load_state()
+            last_uid = state["last_uid"] if state["uidvalidity"] == uidvalidity else 0
+            if state["uidvalidity"] and state["uidvalidity"] != uidvalidity:
+                logger.warning(f"UIDVALIDITY of {self.mailbox} changed, reading the mailbox again")
+
+            typ, data = connection.uid("SEARCH", None, f"UID {last_uid + 1}:*")
+            if typ != "OK":
+                raise imaplib.IMAP4.error(f"SEARCH failed: {data}")
+            # "N:*" always matches the newest message, even when its UID is below N
+            uids = sorted(uid for uid in (int(value) for value in data[0].split()) if uid > last_uid)
+            if not uids:
+                return results
+            logger.info(f"{len(uids)} new message(s) in {self.mailbox}")
+
+            for start in range(0, len(uids), self.batch_size):
+                batch = uids[start:start + self.batch_size]
+                attachments = self._fetch_batch(connection, batch)
+                if attachments:
+                    results.extend(ingest_resumes(
+                        attachments,
+                        self.llm_client,
+                        self.collection,
+                        self.minio_client,
+                        get_skills_mongo(),
+                        job_offer=self.job_offer,
+                        skill_strategy=self.skill_strategy,
+                        duplicate_policy=self.duplicate_policy,
+                        max_workers=self.max_workers,
+                        max_llm_calls=self.max_llm_calls,
+                    ))
+                # Failed attachments are reported, not refetched; their fingerprints allow a manual re-upload
+                self._save_state(uidvalidity, batch[-1])
+        finally:
+            try:
+                connection.logout()
+            except Exception as e:
+                logger.warning(f"IMAP logout failed: {e}")
+
+        stored = len([result for result in results if result["success"]])
+        logger.info(f"Mailbox poll done: {len(results)} attachment(s), {stored} stored")
+        return results
+
+    def run_forever(self, stop_event: threading.Event, poll_interval: float = IMAP_POLL_SECONDS) -> None:
+        while not stop_event.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.exception(f"Mailbox poll failed: {e}")
+            stop_event.wait(poll_interval)
+
+
+if __name__ == "__main__":
+    # python -m services.email_service
+    from clients.mongo_client import mongo_candidat_init
+    from clients.minio_client import MinioClientService
+    from llms.groqClient import GroqClient
+    from llms.cachedClient import CachedLLMClient
+
+    poller = MailboxPoller(CachedLLMClient(GroqClient()), mongo_candidat_init(), MinioClientService())
+    try:
+        poller.run_forever(threading.Event())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,256 @@
+import json
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from utils import extract_resume_text_from_bytes, content_hash, normalized_text_hash, as_datetime
+from clients.mongo_client import find_resume_duplicate, merge_duplicate_resume
+from llms.boundedClient import BoundedLLMClient
+from services.llm_service import resume_to_json
+from services.dictionaire_service import add_skill_if_new_and_replace_similar_ones
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(levelname)s] %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = int(os.getenv("INGESTION_MAX_WORKERS", "4"))
+DEFAULT_MAX_LLM_CALLS = int(os.getenv("INGESTION_MAX_LLM_CALLS", "2"))
+
+# What to do with a resume whose bytes or text are already stored
+DUPLICATE_REJECT = "reject"
+DUPLICATE_MERGE = "merge"
+
+
+def validate_extracted_data(extracted_data: Dict[str, Any]) -> bool:
+    """Validate extracted resume data"""
+    required_fields = ['email', 'full_name']
+
+    for field in required_fields:
+        if field not in extracted_data or not extracted_data[field]:
+            return False
+
+    return True
+
+
+def handle_duplicate(result: Dict[str, Any], existing: Dict[str, Any], duplicate_policy: str, job_offer="", job_offer_date=None) -> Dict[str, Any]:
+    """Fill ``result`` for a resume that is already stored, merging the job offer if asked to"""
+    name = existing.get("full_name", "unknown candidate")
+    if duplicate_policy == DUPLICATE_MERGE:
+        merge_duplicate_resume(
+            existing["_id"],
+            job_offer=job_offer,
+            job_offer_date=as_datetime(job_offer_date) if job_offer_date else None,
+        )
+        result["message"] = f"⚠️ Duplicate resume: merged into existing candidate {name}"
+    else:
+        result["message"] = f"⚠️ Duplicate resume: already stored as {name}"
+    result["data"] = existing
+    return result
+
+
+class ResumeRejected(Exception):
+    """The resume cannot be ingested as is (unusable AI output, missing fields); retrying will not help."""
+
+    def __init__(self, message: str, data: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.message = message
+        self.data = data
+
+
+def parse_resume(resume_text: str, llm_client) -> Dict[str, Any]:
+    """LLM extraction step: structured candidate data from resume text"""
+    cleaned_json = resume_to_json(resume_text, llm_client)
+
+    try:
+        extracted_data = json.loads(cleaned_json)
+
+        # Add current role experience
+        if 'roles_experience' in extracted_data and extracted_data['roles_experience']:
+            extracted_data["current_role_experience"] = max(
+                extracted_data['roles_experience'],
+                key=lambda r: r.get('years_experience', 0)
+            )
+
+    except (json.JSONDecodeError, TypeError) as e:
+        raise ResumeRejected(
+            f"❌ Invalid JSON response from AI model: {str(e)}",
+            data={"error": "Invalid JSON", "raw_output": cleaned_json},
+        )
+
+    if not validate_extracted_data(extracted_data):
+        raise ResumeRejected("❌ Missing required fields (name or email)")
+
+    return extracted_data
+
+
+def normalize_skills(extracted_data: Dict[str, Any], existing_skills, skill_strategy: str, llm_client) -> Dict[str, Any]:
+    """Skills step: map extracted skills onto the reference dictionary, adding new ones"""
+    logger.debug(f"Extracted data BEFORE similarity replace: {extracted_data}")
+    add_skill_if_new_and_replace_similar_ones(
+        extracted_data,
+        existing_skills_set=existing_skills,
+        strategy_name=skill_strategy,
+        llm_client=llm_client
+    )
+    logger.debug(f"Extracted data AFTER similarity replace: {extracted_data}")
+    return extracted_data
+
+
+def store_resume(extracted_data: Dict[str, Any], collection, minio_client, file_hash: str, text_hash: str, pdf_bytes: Optional[bytes] = None, job_offer="", job_offer_date=None):
+    """
+    Storage step: PDF in MinIO under its content hash, candidate in MongoDB.
+    Raises DuplicateKeyError if a candidate with the same fingerprint is already stored.
+    """
+    # Objects are content-addressed, so a re-upload of the same bytes reuses the stored PDF
+    minio_filename = f"{file_hash}.pdf"
+    if pdf_bytes is not None and not minio_client.object_exists(minio_filename):
+        # Same buffer the text was extracted from, no temp file or second read
+        minio_client.upload_bytes(pdf_bytes, minio_filename)
+    extracted_data["minio_file_name"] = minio_filename
+    extracted_data["content_hash"] = file_hash
+    extracted_data["text_hash"] = text_hash
+    extracted_data["upload_timestamp"] = datetime.now()
+
+    if job_offer:
+        extracted_data["job_offer"] = job_offer
+    if job_offer_date:
+        extracted_data["job_offer_date"] = as_datetime(job_offer_date)
+
+    return collection.insert_one(extracted_data).inserted_id
+
+
+def process_single_file(uploaded_file, llm_client, collection, minio_client, existing_skills, job_offer="", job_offer_date=None, skill_strategy: str = "llm", duplicate_policy: str = DUPLICATE_REJECT) -> Dict[str, Any]:
+    """Process a single uploaded resume file (safe to run in a worker thread)"""
+    result = {
+        "success": False,
+        "message": "",
+        "data": None,
+        "filename": uploaded_file.name
+    }
+
+    try:
+        pdf_bytes = uploaded_file.getvalue()
+        file_hash = content_hash(pdf_bytes)
+
+        # Fingerprint checks run before any LLM or embedding work
+        existing = find_resume_duplicate(content_hash=file_hash)
+        if existing:
+            return handle_duplicate(result, existing, duplicate_policy, job_offer, job_offer_date)
+
+        resume_text = extract_resume_text_from_bytes(pdf_bytes)
+
+        if not resume_text.strip():
+            result["message"] = "❌ No text could be extracted from the PDF"
+            return result
+
+        text_hash = normalized_text_hash(resume_text)
+        existing = find_resume_duplicate(text_hash=text_hash)
+        if existing:
+            return handle_duplicate(result, existing, duplicate_policy, job_offer, job_offer_date)
+
+        extracted_data = parse_resume(resume_text, llm_client)
+        normalize_skills(extracted_data, existing_skills, skill_strategy, llm_client)
+
+        try:
+            store_resume(extracted_data, collection, minio_client, file_hash, text_hash, pdf_bytes, job_offer, job_offer_date)
+        except DuplicateKeyError:
+            # Lost a race against a concurrent upload of the same resume
+            existing = find_resume_duplicate(content_hash=file_hash, text_hash=text_hash)
+            if existing:
+                return handle_duplicate(result, existing, duplicate_policy, job_offer, job_offer_date)
+            raise
+
+        result["success"] = True
+        result["message"] = "✅ Resume processed and saved successfully!"
+        result["data"] = extracted_data
+
+        logger.info(f"Successfully processed {uploaded_file.name}")
+
+    except ResumeRejected as e:
+        result["message"] = e.message
+        result["data"] = e.data
+
+    except Exception as e:
+        logger.exception(f"Error processing {uploaded_file.name}: {e}")
+        result["message"] = f"❌ Error processing file: {str(e)}"
+
+    return result
+
+
+def ingest_resumes(
+    uploaded_files: List,
+    llm_client,
+    collection,
+    minio_client,
+    existing_skills,
+    job_offer="",
+    job_offer_date=None,
+    skill_strategy: str = "llm",
+    duplicate_policy: str = DUPLICATE_REJECT,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_llm_calls: int = DEFAULT_MAX_LLM_CALLS,
+    on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Process several resumes on a bounded worker pool.
+
+    At most ``max_llm_calls`` LLM requests are in flight at once, shared by the
+    resume extraction and the skill normalization steps. ``on_result(index, result)``
+    is called from the calling thread as soon as each file finishes, so Streamlit
+    elements can be updated from it. The returned list follows the input order.
+    """
+    if not uploaded_files:
+        return []
+
+    bounded_client = BoundedLLMClient(llm_client, max_in_flight=max_llm_calls)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(uploaded_files)
+
+    # Identical files inside the same batch are resolved up front instead of racing each other
+    seen_hashes: Dict[str, str] = {}
+    to_process = []
+    for index, uploaded_file in enumerate(uploaded_files):
+        file_hash = content_hash(uploaded_file.getvalue())
+        if file_hash in seen_hashes:
+            results[index] = {
+                "success": False,
+                "message": f"⚠️ Duplicate resume: same file as {seen_hashes[file_hash]} in this batch",
+                "data": None,
+                "filename": uploaded_file.name,
+            }
+            if on_result is not None:
+                on_result(index, results[index])
+            continue
+        seen_hashes[file_hash] = uploaded_file.name
+        to_process.append(index)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="ingest") as executor:
+        futures = {
+            executor.submit(
+                process_single_file,
+                uploaded_files[index],
+                bounded_client,
+                collection,
+                minio_client,
+                existing_skills,
+                job_offer,
+                job_offer_date,
+                skill_strategy,
+                duplicate_policy,
+            ): index
+            for index in to_process
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            result = future.result()
+            results[index] = result
+            if on_result is not None:
+                on_result(index, result)
+
+    logger.info(f"Ingested {len(results)} files with {max_workers} workers and {max_llm_calls} concurrent LLM calls")
+    return results
@@ -0,0 +1,283 @@
+import os
+import socket
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from utils import extract_resume_text_from_bytes, content_hash, normalized_text_hash, as_datetime
+from clients.mongo_client import collection_jobs, find_resume_duplicate, get_skills_mongo
+from services.ingestion_service import (
+    DUPLICATE_REJECT,
+    ResumeRejected,
+    handle_duplicate,
+    parse_resume,
+    normalize_skills,
+    store_resume,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(levelname)s] %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Must outlast the slowest step (one LLM call), or another worker takes the job over
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_RETRY_BASE_SECONDS = int(os.getenv("JOB_RETRY_BASE_SECONDS", "30"))
+
+# A job's state is the step it is at; each step persists its output before moving on,
+# so a retried or taken-over job resumes where it stopped instead of starting over
+STATE_QUEUED = "queued"
+STATE_EXTRACTING = "extracting"
+STATE_LLM = "llm"
+STATE_SKILLS = "skills"
+STATE_STORED = "stored"
+STATE_FAILED = "failed"
+
+ACTIVE_STATES = [STATE_QUEUED, STATE_EXTRACTING, STATE_LLM, STATE_SKILLS]
+TERMINAL_STATES = [STATE_STORED, STATE_FAILED]
+
+
+def new_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def enqueue_job(uploaded_file, minio_client, job_offer="", job_offer_date=None, skill_strategy: str = "llm",
+                llm_backend: str = "groq", duplicate_policy: str = DUPLICATE_REJECT, collection=collection_jobs) -> str:
+    """
+    Stage the PDF in MinIO and queue it for a worker. Returns the job id (the file's content hash).
+
+    Enqueuing the same file again reuses its job with the new settings: a finished (stored or
+    failed) job is re-queued, so a re-upload goes through the duplicate check and policy again,
+    e.g. to merge a new job offer; a queued or running job gets the settings for its next steps.
+    """
+    pdf_bytes = uploaded_file.getvalue()
+    file_hash = content_hash(pdf_bytes)
+    object_name = f"{file_hash}.pdf"
+    if not minio_client.object_exists(object_name):
+        minio_client.upload_bytes(pdf_bytes, object_name)
+
+    now = datetime.now()
+    settings = {
+        "file_name": uploaded_file.name,
+        "job_offer": job_offer,
+        "job_offer_date": as_datetime(job_offer_date) if job_offer_date else None,
+        "skill_strategy": skill_strategy,
+        "llm_backend": llm_backend,
+        "duplicate_policy": duplicate_policy,
+    }
+    # Finished jobs restart from scratch; a stored resume is then caught by the duplicate check
+    restarted = collection.update_one(
+        {"_id": file_hash, "state": {"$in": TERMINAL_STATES}},
+        {
+            "$set": {**settings, "state": STATE_QUEUED, "attempts": 0, "next_attempt_at": now, "success": False,
+                     "lease_owner": None, "lease_until": None, "error": None, "message": "", "updated_at": now},
+            "$unset": {"resume_text": "", "text_hash": "", "extracted_data": "", "candidate_id": "", "duplicate_of": ""},
+        },
+    )
+    if restarted.modified_count:
+        logger.info(f"Re-queued finished job {file_hash[:12]} ({uploaded_file.name})")
+        return file_hash
+
+    # Steps re-read the job when they advance, so the next ones use these settings
+    updated = collection.update_one(
+        {"_id": file_hash, "state": {"$in": ACTIVE_STATES}},
+        {"$set": {**settings, "updated_at": now}},
+    )
+    if updated.matched_count:
+        logger.info(f"Updated the settings of pending job {file_hash[:12]} ({uploaded_file.name})")
+        return file_hash
+
+    collection.update_one(
+        {"_id": file_hash},
+        {"$setOnInsert": {
+            **settings,
+            "object_name": object_name,
+            "state": STATE_QUEUED,
+            "attempts": 0,
+            "max_attempts": JOB_MAX_ATTEMPTS,
+            "next_attempt_at": now,
+            "lease_owner": None,
+            "lease_until": None,
+            "success": False,
+            "message": "",
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }},
+        upsert=True,
+    )
+    return file_hash
+
+
+def get_jobs(job_ids: List[str], collection=collection_jobs) -> List[Dict[str, Any]]:
+    """Jobs in the given order, without their bulky intermediate outputs"""
+    projection = {"resume_text": 0, "extracted_data": 0}
+    jobs = {job["_id"]: job for job in collection.find({"_id": {"$in": list(job_ids)}}, projection)}
+    return [jobs[job_id] for job_id in job_ids if job_id in jobs]
+
+
+def get_queue_counts(collection=collection_jobs) -> Dict[str, int]:
+    counts = {state: 0 for state in ACTIVE_STATES + TERMINAL_STATES}
+    for doc in collection.aggregate([{"$group": {"_id": "$state", "count": {"$sum": 1}}}]):
+        counts[doc["_id"]] = doc["count"]
+    return counts
+
+
+def claim_job(worker_id: str, collection=collection_jobs) -> Optional[Dict[str, Any]]:
+    """Lease the oldest due job that no live worker holds"""
+    now = datetime.now()
+    return collection.find_one_and_update(
+        {
+            "state": {"$in": ACTIVE_STATES},
+            "next_attempt_at": {"$lte": now},
+            "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}],
+        },
+        {"$set": {
+            "lease_owner": worker_id,
+            "lease_until": now + timedelta(seconds=JOB_LEASE_SECONDS),
+            "updated_at": now,
+        }},
+        sort=[("next_attempt_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _advance(job: Dict[str, Any], worker_id: str, fields: Dict[str, Any], collection=collection_jobs) -> Optional[Dict[str, Any]]:
+    """Persist a step's output and renew the lease; None if another worker has taken the job over"""
+    now = datetime.now()
+    fields = {**fields, "updated_at": now}
+    if fields.get("state") in TERMINAL_STATES:
+        fields.update({"lease_owner": None, "lease_until": None})
+    else:
+        fields.setdefault("lease_until", now + timedelta(seconds=JOB_LEASE_SECONDS))
+    updated = collection.find_one_and_update(
+        {"_id": job["_id"], "lease_owner": worker_id},
+        {"$set": fields},
+        return_document=ReturnDocument.AFTER,
+    )
+    if updated is None:
+        logger.warning(f"Lost the lease on job {job['_id'][:12]}, leaving it to its new owner")
+    return updated
+
+
+def _duplicate_outcome(job: Dict[str, Any], existing: Dict[str, Any]) -> Dict[str, Any]:
+    result = {"success": False, "message": "", "data": None, "filename": job["file_name"]}
+    handle_duplicate(result, existing, job["duplicate_policy"], job.get("job_offer"), job.get("job_offer_date"))
+    return {"state": STATE_STORED, "message": result["message"], "duplicate_of": existing["_id"]}
+
+
+def _extract_step(job, llm_client, minio_client, collection) -> Dict[str, Any]:
+    existing = find_resume_duplicate(content_hash=job["_id"])
+    if existing:
+        return _duplicate_outcome(job, existing)
+
+    with minio_client.open_file(job["object_name"]) as response:
+        pdf_bytes = response.read()
+    resume_text = extract_resume_text_from_bytes(pdf_bytes)
+    if not resume_text.strip():
+        raise ResumeRejected("❌ No text could be extracted from the PDF")
+
+    text_hash = normalized_text_hash(resume_text)
+    existing = find_resume_duplicate(text_hash=text_hash)
+    if existing:
+        return _duplicate_outcome(job, existing)
+    return {"state": STATE_LLM, "resume_text": resume_text, "text_hash": text_hash}
+
+
+def _llm_step(job, llm_client, minio_client, collection) -> Dict[str, Any]:
+    return {"state": STATE_SKILLS, "extracted_data": parse_resume(job["resume_text"], llm_client)}
+
+
+def _skills_step(job, llm_client, minio_client, collection) -> Dict[str, Any]:
+    extracted_data = dict(job["extracted_data"])
+    normalize_skills(extracted_data, get_skills_mongo(), job["skill_strategy"], llm_client)
+    try:
+        candidate_id = store_resume(
+            extracted_data, collection, minio_client, job["_id"], job["text_hash"],
+            job_offer=job.get("job_offer"), job_offer_date=job.get("job_offer_date"),
+        )
+    except DuplicateKeyError:
+        # Same file bytes: our own insert from an attempt that died or lost its lease before recording it
+        own = find_resume_duplicate(content_hash=job["_id"])
+        if own is not None:
+            candidate_id = own["_id"]
+        else:
+            existing = find_resume_duplicate(text_hash=job["text_hash"])
+            if existing is None:
+                raise
+            return _duplicate_outcome(job, existing)
+    return {
+        "state": STATE_STORED,
+        "success": True,
+        "message": "✅ Resume processed and saved successfully!",
+        "candidate_id": candidate_id,
+        "resume_text": None,
+    }
+
+
+STEPS = {
+    STATE_EXTRACTING: _extract_step,
+    STATE_LLM: _llm_step,
+    STATE_SKILLS: _skills_step,
+}
+
+
+def run_job(job: Dict[str, Any], worker_id: str, llm_clients: Dict[str, Any], minio_client, collection,
+            jobs_collection=collection_jobs) -> Optional[Dict[str, Any]]:
+    """Drive a claimed job through its remaining steps; failures are retried with backoff until max_attempts"""
+    llm_client = llm_clients[job["llm_backend"]]
+    if job["state"] == STATE_QUEUED:
+        job = _advance(job, worker_id, {"state": STATE_EXTRACTING}, jobs_collection)
+
+    while job is not None and job["state"] not in TERMINAL_STATES:
+        state = job["state"]
+        try:
+            fields = STEPS[state](job, llm_client, minio_client, collection)
+        except ResumeRejected as e:
+            return _advance(job, worker_id, {"state": STATE_FAILED, "message": e.message, "error": e.message}, jobs_collection)
+        except Exception as e:
+            logger.exception(f"Job {job['_id'][:12]} ({job['file_name']}) failed at step {state}: {e}")
+            attempts = job["attempts"] + 1
+            if attempts >= job["max_attempts"]:
+                return _advance(job, worker_id, {
+                    "state": STATE_FAILED,
+                    "attempts": attempts,
+                    "message": f"❌ Error processing file: {str(e)}",
+                    "error": str(e),
+                }, jobs_collection)
+            # Same step again later, on whichever worker claims it first
+            delay = JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+            return _advance(job, worker_id, {
+                "attempts": attempts,
+                "error": str(e),
+                "next_attempt_at": datetime.now() + timedelta(seconds=delay),
+                "lease_owner": None,
+                "lease_until": None,
+            }, jobs_collection)
+        job = _advance(job, worker_id, fields, jobs_collection)
+
+    if job is not None:
+        logger.info(f"Job {job['_id'][:12]} ({job['file_name']}) finished: {job['state']}")
+    return job
+
+
+def run_worker_loop(worker_id: str, llm_clients: Dict[str, Any], minio_client, collection,
+                    stop_event: threading.Event, poll_interval: float = 2.0, jobs_collection=collection_jobs) -> None:
+    """Claim and run jobs until stop_event is set, sleeping poll_interval when the queue is empty"""
+    while not stop_event.is_set():
+        job = claim_job(worker_id, jobs_collection)
+        if job is None:
+            stop_event.wait(poll_interval)
+            continue
+        try:
+            run_job(job, worker_id, llm_clients, minio_client, collection, jobs_collection)
+        except Exception as e:
+            # Lease expiry hands the job to another worker
+            logger.exception(f"Worker {worker_id} could not update job {job['_id'][:12]}: {e}")
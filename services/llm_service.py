@@ -5,6 +5,10 @@ import logging
 import yaml
 from llms.groqClient import GroqClient
 from llms.ollamaClient import OllamaClient
+from services.query_cache import get_query_cache
+from services.query_compiler import compile_question
+from services.query_guard import validate_query, guarded_aggregate, UnsafeQueryError, QUERY_MAX_RESULTS
+from services.ranking import ranking_stages
 
 
 logging.basicConfig(
@@ -93,11 +97,57 @@ def text_to_mongo_query(text, llm_client, skills_dict):
     
     return clean_json(result_json_query)
 
-def query_to_resume(query,collection):
+def question_to_mongo_query(question, llm_client, skills_dict):
+    """
+    Mongo query for a chat question, from the cheapest source that can answer it: the rule-based
+    compiler, then the semantic query cache, then text_to_mongo_query.
+    Returns (query, source) with source one of "rules", "cache" or "llm".
+    """
+    query = compile_question(question, skills_dict)
+    if query is not None:
+        return query, "rules"
+
+    try:
+        cache = get_query_cache()
+        cached_query, vector = cache.lookup(question, skills_dict)
+    except Exception as e:
+        # Embedding service unavailable: the LLM path still works
+        logger.warning(f"Semantic query cache unavailable: {e}")
+        return text_to_mongo_query(question, llm_client, skills_dict), "llm"
+    if cached_query is not None:
+        return cached_query, "cache"
+
+    query = text_to_mongo_query(question, llm_client, skills_dict)
+    try:
+        dict_query = yaml.safe_load(query) if query else None
+    except yaml.YAMLError:
+        dict_query = None
+    # Only real, runnable filters are worth reusing; general questions produce an empty query
+    if isinstance(dict_query, dict) and dict_query:
+        try:
+            validate_query(dict_query)
+            cache.store(question, query, skills_dict, vector)
+        except UnsafeQueryError:
+            pass
+    return query, "llm"
+
+def query_to_resume(query,collection,extra_filter=None,projection=None,limit=QUERY_MAX_RESULTS):
+    """
+    Run the generated query, ANDed with extra_filter (e.g. the sidebar filters) so filtering happens in MongoDB.
+    The generated part goes through the query guard; raises UnsafeQueryError when it refuses the query.
+    Matches come back best first with a relevance score (services.ranking), and only the top limit
+    leave the server. projection keeps callers that only display a few fields from fetching whole documents.
+    """
     dict_query = yaml.safe_load(query)
     if not dict_query:
         return []
-    return collection.find(dict_query)
+    dict_query = validate_query(dict_query)
+    stages = ranking_stages(dict_query)
+    if extra_filter:
+        dict_query = {"$and": [dict_query, extra_filter]}
+    if projection:
+        projection = {**projection, "relevance": 1}
+    return guarded_aggregate(collection, dict_query, stages, projection=projection, limit=min(limit, QUERY_MAX_RESULTS))
 
 
 
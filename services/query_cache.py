@@ -0,0 +1,121 @@
+import os
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import numpy as np
+
+from embeddings.google_langchain_chroma_Adapter import FixedGoogleEmbedding
+from services.query_compiler import question_terms
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+
+_NUMBER_PATTERN = re.compile(r"\d+(?:\.\d+)?")
+
+
+def skills_fingerprint(skills_dict) -> str:
+    """Stable hash of the skills dictionary; generated queries are only valid for the dictionary they were built with."""
+    normalized = sorted({str(skill).strip().lower() for skill in skills_dict or []})
+    return hashlib.sha256("\n".join(normalized).encode("utf-8")).hexdigest()
+
+
+def _numbers(text: str) -> frozenset:
+    return frozenset(_NUMBER_PATTERN.findall(text))
+
+
+class SemanticQueryCache:
+    """
+    Maps questions to the Mongo query generated for them, and serves it again for
+    questions whose embedding has a cosine similarity of at least threshold.
+
+    "python devs 5 years" and "python devs 3 years" embed almost identically, and so
+    can "python developers in Paris" and "java developers in Paris": a match also
+    requires both questions to contain the same numbers and to name the same known
+    skills and roles. Entries built with another skills dictionary are dropped as
+    soon as the dictionary changes.
+    """
+
+    def __init__(self, embed_fn: Callable[[str], list[float]], threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._fingerprint: Optional[str] = None
+        # question -> (unit vector, numbers and named skills / roles, query), least recently used first
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embed_fn(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_fingerprint(self, fingerprint: str) -> None:
+        if fingerprint != self._fingerprint:
+            if self._entries:
+                logger.info(f"Skills dictionary changed, dropping {len(self._entries)} cached queries")
+            self._entries.clear()
+            self._fingerprint = fingerprint
+
+    def lookup(self, question: str, skills_dict) -> tuple[Optional[str], Optional[np.ndarray]]:
+        """The cached query for a similar question, or None; also returns the question's embedding for store()."""
+        fingerprint = skills_fingerprint(skills_dict)
+        vector = self._embed(question)
+        terms = (_numbers(question), question_terms(question, skills_dict))
+        with self._lock:
+            self._check_fingerprint(fingerprint)
+            best_question, best_score = None, -1.0
+            for cached_question, (cached_vector, cached_terms, _) in self._entries.items():
+                if cached_terms != terms:
+                    continue
+                score = float(cached_vector @ vector)
+                if score > best_score:
+                    best_question, best_score = cached_question, score
+            if best_question is None or best_score < self.threshold:
+                self.misses += 1
+                return None, vector
+            self._entries.move_to_end(best_question)
+            self.hits += 1
+            logger.info(f"Semantic cache hit ({best_score:.3f}): '{question}' ~ '{best_question}'")
+            return self._entries[best_question][2], vector
+
+    def store(self, question: str, query: str, skills_dict, vector: Optional[np.ndarray] = None) -> None:
+        fingerprint = skills_fingerprint(skills_dict)
+        if vector is None:
+            vector = self._embed(question)
+        with self._lock:
+            self._check_fingerprint(fingerprint)
+            self._entries[question] = (vector, (_numbers(question), question_terms(question, skills_dict)), query)
+            self._entries.move_to_end(question)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_query_cache = None
+_query_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> SemanticQueryCache:
+    global _query_cache
+    with _query_cache_lock:
+        if _query_cache is None:
+            _query_cache = SemanticQueryCache(FixedGoogleEmbedding().embed_query)
+        return _query_cache
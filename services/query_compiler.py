@@ -0,0 +1,172 @@
+import os
+import re
+import json
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+SENIOR_MIN_YEARS = int(os.getenv("SENIOR_MIN_YEARS", "5"))
+JUNIOR_MAX_YEARS = int(os.getenv("JUNIOR_MAX_YEARS", "2"))
+
+# Canonical role -> phrasings; matched against roles_experience.role, which is free text
+ROLES = {
+    "data scientist": ["data scientist", "data scientists"],
+    "data analyst": ["data analyst", "data analysts"],
+    "data engineer": ["data engineer", "data engineers"],
+    "machine learning engineer": ["machine learning engineer", "ml engineer", "ml engineers"],
+    "devops engineer": ["devops engineer", "devops engineers"],
+    "software engineer": ["software engineer", "software engineers"],
+    "frontend developer": ["frontend developer", "front-end developer", "front end developer", "frontend developers"],
+    "backend developer": ["backend developer", "back-end developer", "back end developer", "backend developers"],
+    "full stack developer": ["full stack developer", "fullstack developer", "full-stack developer", "full stack developers"],
+    "mobile developer": ["mobile developer", "mobile developers"],
+    "web developer": ["web developer", "web developers"],
+    "project manager": ["project manager", "project managers"],
+    "product manager": ["product manager", "product managers"],
+    "business analyst": ["business analyst", "business analysts"],
+    "qa engineer": ["qa engineer", "test engineer", "qa engineers"],
+    "architect": ["software architect", "solutions architect", "architect", "architects"],
+    "consultant": ["consultant", "consultants"],
+    "designer": ["ui/ux designer", "ux designer", "ui designer", "designer", "designers"],
+}
+
+# Words that carry no filter; anything else left over sends the question to the LLM
+FILLER_WORDS = {
+    "i", "im", "i'm", "we", "am", "are", "is", "looking", "look", "search", "searching", "find", "show", "list", "give",
+    "get", "me", "us", "need", "want", "a", "an", "the", "any", "all", "some", "with", "and", "who", "that", "which",
+    "knows", "know", "knowing", "in", "of", "on", "for", "using", "uses", "use", "experience", "experienced",
+    "expertise", "expert", "experts", "skilled", "skills", "skill", "proficient", "strong", "good", "knowledge",
+    "background", "candidate", "candidates", "profile", "profiles", "people", "person", "someone", "developer",
+    "developers", "dev", "devs", "engineer", "engineers", "programmer", "programmers", "has", "have", "having",
+    "least", "at", "minimum", "min", "plus", "more", "than", "over", "year", "years", "yr", "yrs", "please",
+    "resume", "resumes", "cv", "cvs", "level", "working", "worked", "as",
+}
+
+# Words that change the meaning in ways the rules do not model
+UNSUPPORTED_WORDS = {"or", "not", "without", "except", "no", "less", "under", "below", "between", "max", "maximum", "fewer"}
+
+_YEARS_PATTERN = re.compile(
+    r"(?P<prefix>at least|minimum(?: of)?|min|more than|over)?\s*(?P<years>\d+)\s*(?P<plus>\+)?\s*(?:years?|yrs?)\b"
+)
+_WORD_PATTERN = re.compile(r"[a-z0-9'+#./-]+")
+
+_stats_lock = threading.Lock()
+_attempts = 0
+_hits = 0
+
+
+def _regex_literal(text: str) -> str:
+    # re.escape also escapes spaces, which Mongo accepts but makes stored queries hard to read
+    return re.escape(text).replace("\\ ", " ")
+
+
+def _phrase_pattern(phrase: str) -> re.Pattern:
+    # Word boundaries that also work for skills such as "c++", "c#" or "node.js"
+    return re.compile(r"(?<![\w+#.])" + re.escape(phrase) + r"(?![\w+#])")
+
+
+def _take(text: str, phrases: list[str]) -> tuple[list[str], str]:
+    """Find phrases in text, longest first, blanking each match so shorter phrases cannot reuse it"""
+    found = []
+    for phrase in sorted(phrases, key=len, reverse=True):
+        pattern = _phrase_pattern(phrase)
+        if pattern.search(text):
+            found.append(phrase)
+            text = pattern.sub(" ", text)
+    return found, text
+
+
+def _roles_and_skills(text: str, skills_dict) -> tuple[list[str], list[str], str]:
+    """Canonical roles and known skills mentioned in text, and the text with them blanked out"""
+    role_phrases = {phrase: role for role, phrases in ROLES.items() for phrase in phrases}
+    matched_roles, text = _take(text, list(role_phrases))
+    roles = list(dict.fromkeys(role_phrases[phrase] for phrase in matched_roles))
+    skills, text = _take(text, list({str(skill).strip().lower() for skill in skills_dict or [] if str(skill).strip()}))
+    return roles, skills, text
+
+
+def question_terms(question: str, skills_dict) -> frozenset:
+    """Known roles and skills a question names; "python developers" and "java developers" differ here"""
+    roles, skills, _ = _roles_and_skills(" " + question.lower().strip().rstrip("?.!") + " ", skills_dict)
+    return frozenset([f"role:{role}" for role in roles] + [f"skill:{skill}" for skill in skills])
+
+
+def _years_condition(text: str) -> tuple[Optional[dict], str]:
+    conditions = []
+    for match in _YEARS_PATTERN.finditer(text):
+        years = int(match.group("years"))
+        conditions.append({"$gt": years} if match.group("prefix") in ("more than", "over") else {"$gte": years})
+    text = _YEARS_PATTERN.sub(" ", text)
+
+    words = set(_WORD_PATTERN.findall(text))
+    if words & {"senior", "seniors", "sr"}:
+        conditions.append({"$gte": SENIOR_MIN_YEARS})
+    if words & {"junior", "juniors", "jr"}:
+        conditions.append({"$lte": JUNIOR_MAX_YEARS})
+    text = re.sub(r"\b(?:seniors?|sr|juniors?|jr)\b", " ", text)
+
+    if len(conditions) > 1:
+        raise ValueError("several experience thresholds")
+    return (conditions[0] if conditions else None), text
+
+
+def _record(hit: bool) -> None:
+    global _attempts, _hits
+    with _stats_lock:
+        _attempts += 1
+        _hits += int(hit)
+
+
+def fast_path_stats() -> dict:
+    with _stats_lock:
+        return {"attempts": _attempts, "hits": _hits, "hit_rate": _hits / _attempts if _attempts else 0.0}
+
+
+def compile_question(question: str, skills_dict) -> Optional[str]:
+    """
+    Mongo query (JSON, like the LLM output) for questions made only of known skills, a known
+    role and an experience threshold, e.g. "senior python developers", "data scientists who
+    know pandas" or "java 5+ years". None when anything in the question is not understood.
+    """
+    text = " " + question.lower().strip().rstrip("?.!") + " "
+    words = set(_WORD_PATTERN.findall(text))
+    if words & UNSUPPORTED_WORDS:
+        _record(False)
+        return None
+
+    try:
+        years, text = _years_condition(text)
+    except ValueError:
+        _record(False)
+        return None
+
+    roles, skills, text = _roles_and_skills(text, skills_dict)
+
+    # A number the years pattern did not take ("10 python developers", "python 3") is not understood either
+    leftover = [word for word in _WORD_PATTERN.findall(text) if word not in FILLER_WORDS]
+    # One role at most, and a threshold must have exactly one thing to apply to
+    ambiguous = len(roles) > 1 or (years is not None and len(skills) + len(roles) != 1)
+    if leftover or ambiguous or not (skills or roles):
+        if leftover:
+            logger.debug(f"Fast path cannot cover {leftover} in '{question}'")
+        _record(False)
+        return None
+
+    conditions = []
+    for skill in skills:
+        match = {"technology": {"$regex": f"^{_regex_literal(skill)}$", "$options": "i"}}
+        if years is not None:
+            match["years_experience"] = years
+        conditions.append({"skills": {"$elemMatch": match}})
+    for role in roles:
+        match = {"role": {"$regex": _regex_literal(role), "$options": "i"}}
+        if years is not None:
+            match["years_experience"] = years
+        conditions.append({"roles_experience": {"$elemMatch": match}})
+
+    query = conditions[0] if len(conditions) == 1 else {"$and": conditions}
+    _record(True)
+    logger.info(f"Fast path compiled '{question}' without the LLM")
+    return json.dumps(query)
@@ -0,0 +1,218 @@
+import os
+import re
+import logging
+from datetime import date, datetime
+from typing import Any, Optional
+
+from clients.mongo_indexes import explain_plan
+
+logger = logging.getLogger(__name__)
+
+QUERY_MAX_RESULTS = int(os.getenv("QUERY_MAX_RESULTS", "100"))
+QUERY_MAX_TIME_MS = int(os.getenv("QUERY_MAX_TIME_MS", "2000"))
+# Full collection scans are refused once the collection holds more documents than this
+QUERY_COLLSCAN_MAX_DOCS = int(os.getenv("QUERY_COLLSCAN_MAX_DOCS", "5000"))
+
+MAX_DEPTH = 8
+MAX_NODES = 200
+MAX_LIST_LENGTH = 200
+MAX_REGEX_LENGTH = 200
+
+QUERY_OPERATORS = {
+    "$and", "$or", "$nor", "$not", "$eq", "$ne", "$gt", "$gte", "$lt", "$lte", "$in", "$nin",
+    "$exists", "$regex", "$options", "$elemMatch", "$all", "$size", "$type",
+}
+# Server-side JavaScript or aggregation expressions: arbitrary cost, never index-backed
+FORBIDDEN_OPERATORS = {"$where", "$expr", "$function", "$accumulator", "$jsonSchema", "$text", "$comment"}
+
+# Top-level candidate fields a chat query may filter on; sub-fields follow with dot notation
+ALLOWED_FIELDS = {
+    "full_name", "email", "phone", "address", "location", "current_role", "skills", "roles_experience",
+    "current_role_experience", "education", "certifications", "projects", "summary", "languages_spoken",
+    "any_other_relevant_information", "job_offer", "job_offer_date", "upload_timestamp",
+}
+# Long free text where an unanchored regex reads every document
+FREE_TEXT_FIELDS = {"summary"}
+
+_FIELD_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z0-9_]+)*$")
+_REGEX_METACHARACTERS = set(".^$*+?()[]{}|\\")
+
+
+class UnsafeQueryError(ValueError):
+    """A generated query that the guard refuses to run."""
+
+
+def _check_scalar(value: Any) -> None:
+    if value is not None and not isinstance(value, (str, int, float, bool, datetime, date)):
+        raise UnsafeQueryError(f"Unsupported value type {type(value).__name__}")
+
+
+def _check_regex(condition: dict) -> None:
+    pattern = condition["$regex"]
+    if not isinstance(pattern, str) or len(pattern) > MAX_REGEX_LENGTH:
+        raise UnsafeQueryError("$regex must be a string of at most %d characters" % MAX_REGEX_LENGTH)
+    try:
+        re.compile(pattern)
+    except re.error as e:
+        raise UnsafeQueryError(f"Invalid $regex {pattern!r}: {e}")
+    options = condition.get("$options", "")
+    if not isinstance(options, str) or set(options) - set("imsx"):
+        raise UnsafeQueryError(f"Unsupported $options {options!r}")
+
+
+class _Validator:
+    def __init__(self):
+        self.nodes = 0
+
+    def _count(self, depth: int) -> None:
+        self.nodes += 1
+        if self.nodes > MAX_NODES:
+            raise UnsafeQueryError(f"Query has more than {MAX_NODES} nodes")
+        if depth > MAX_DEPTH:
+            raise UnsafeQueryError(f"Query is nested deeper than {MAX_DEPTH} levels")
+
+    def filter(self, query: Any, depth: int, top_level: bool) -> dict:
+        """A document filter: field conditions and logical operators"""
+        self._count(depth)
+        if not isinstance(query, dict):
+            raise UnsafeQueryError("A filter must be an object")
+        result = {}
+        for key, value in query.items():
+            if not isinstance(key, str):
+                raise UnsafeQueryError("Field names must be strings")
+            if key in FORBIDDEN_OPERATORS:
+                raise UnsafeQueryError(f"Operator {key} is not allowed")
+            if key in ("$and", "$or", "$nor"):
+                if not isinstance(value, list) or not value or len(value) > MAX_LIST_LENGTH:
+                    raise UnsafeQueryError(f"{key} needs a non-empty list")
+                result[key] = [self.filter(item, depth + 1, top_level=False) for item in value]
+            elif key.startswith("$"):
+                raise UnsafeQueryError(f"Operator {key} is not allowed here")
+            else:
+                if not _FIELD_PATTERN.match(key):
+                    raise UnsafeQueryError(f"Invalid field name {key!r}")
+                if top_level and key.split(".")[0] not in ALLOWED_FIELDS:
+                    raise UnsafeQueryError(f"Field {key} is not part of the candidate model")
+                result[key] = self.condition(value, depth + 1)
+        return result
+
+    def condition(self, value: Any, depth: int) -> Any:
+        """The value side of a field: an equality value or an operator document"""
+        self._count(depth)
+        if isinstance(value, list):
+            if len(value) > MAX_LIST_LENGTH:
+                raise UnsafeQueryError(f"Lists are limited to {MAX_LIST_LENGTH} items")
+            for item in value:
+                _check_scalar(item)
+            return value
+        if not isinstance(value, dict):
+            _check_scalar(value)
+            return value
+        if not any(isinstance(key, str) and key.startswith("$") for key in value):
+            raise UnsafeQueryError("Embedded document equality is not supported, use dot notation")
+
+        result = {}
+        for operator, operand in value.items():
+            if operator in FORBIDDEN_OPERATORS or operator not in QUERY_OPERATORS or operator in ("$and", "$or", "$nor"):
+                raise UnsafeQueryError(f"Operator {operator} is not allowed")
+            if operator == "$elemMatch":
+                # Sub-documents of skills, roles_experience, ... are matched by their own fields
+                result[operator] = self.filter(operand, depth + 1, top_level=False)
+            elif operator == "$not":
+                result[operator] = self.condition(operand, depth + 1)
+            elif operator in ("$in", "$nin", "$all"):
+                if not isinstance(operand, list):
+                    raise UnsafeQueryError(f"{operator} needs a list")
+                result[operator] = self.condition(operand, depth + 1)
+            else:
+                _check_scalar(operand)
+                result[operator] = operand
+        if "$regex" in result:
+            _check_regex(result)
+        elif "$options" in result:
+            raise UnsafeQueryError("$options without $regex")
+        return result
+
+
+def _is_literal_regex(condition: Any) -> bool:
+    return (
+        isinstance(condition, dict)
+        and set(condition) <= {"$regex", "$options"}
+        and isinstance(condition.get("$regex"), str)
+        and condition["$regex"].strip() != ""
+        and not set(condition["$regex"]) & _REGEX_METACHARACTERS
+    )
+
+
+def _rewrite_free_text(query: dict) -> dict:
+    """
+    An unanchored regex on a free-text field scans every document. A top-level literal one is
+    turned into a $text phrase search on the summary text index; anything else is refused.
+    """
+    rewritten = dict(query)
+    for field in FREE_TEXT_FIELDS & set(query):
+        condition = query[field]
+        if not isinstance(condition, dict) or "$regex" not in condition or condition["$regex"].startswith("^"):
+            continue
+        if not _is_literal_regex(condition) or "$text" in rewritten:
+            raise UnsafeQueryError(f"Pattern search on {field} is too expensive, search for words instead")
+        del rewritten[field]
+        rewritten["$text"] = {"$search": f'"{condition["$regex"].strip()}"'}
+        logger.info(f"Rewrote regex on {field} into a text search")
+    return rewritten
+
+
+def _nested_free_text_regex(query: Any) -> bool:
+    if isinstance(query, dict):
+        for key, value in query.items():
+            if key in FREE_TEXT_FIELDS and isinstance(value, dict) and isinstance(value.get("$regex"), str) and not value["$regex"].startswith("^"):
+                return True
+            if _nested_free_text_regex(value):
+                return True
+    elif isinstance(query, list):
+        return any(_nested_free_text_regex(item) for item in query)
+    return False
+
+
+def validate_query(query: Any) -> dict:
+    """
+    Check a generated filter against the operator and field allowlists and rewrite expensive
+    constructs. Raises UnsafeQueryError for anything that cannot be made safe.
+    """
+    if not isinstance(query, dict) or not query:
+        raise UnsafeQueryError("An empty filter would return every candidate")
+    validated = _Validator().filter(query, depth=0, top_level=True)
+    # $text is only allowed at the top level, next to other conditions
+    top_level = {key: value for key, value in validated.items() if key != "$and"}
+    and_clauses = validated.get("$and", [])
+    if _nested_free_text_regex([top_level.get(key) for key in ("$or", "$nor")] + and_clauses):
+        raise UnsafeQueryError("Pattern search on free text is only supported at the top level of a query")
+    return _rewrite_free_text(validated)
+
+
+def _check_plan(collection, query: dict, limit: int, max_time_ms: int) -> None:
+    """Refuse queries whose winning plan scans a large collection from end to end."""
+    stages, index_names = explain_plan(collection.find(query).limit(limit).max_time_ms(max_time_ms))
+    if "COLLSCAN" in stages:
+        document_count = collection.estimated_document_count()
+        if document_count > QUERY_COLLSCAN_MAX_DOCS:
+            raise UnsafeQueryError(
+                f"This search would scan all {document_count} candidates; add a skill, role or job offer to narrow it"
+            )
+        logger.info(f"Allowing a collection scan over {document_count} documents")
+    else:
+        logger.debug(f"Query served by indexes {sorted(index_names)}")
+
+
+def guarded_aggregate(collection, query: dict, stages: list, projection: Optional[dict] = None,
+                      limit: int = QUERY_MAX_RESULTS, max_time_ms: int = QUERY_MAX_TIME_MS):
+    """
+    $match on query, then stages, $limit and the optional $project, with a server-side time
+    limit, after checking with explain() that the plan does not scan a large collection from
+    end to end. The leading $match gets the plan find() would, so that is what gets explained.
+    """
+    _check_plan(collection, query, limit, max_time_ms)
+    pipeline = [{"$match": query}, *stages, {"$limit": limit}]
+    if projection:
+        pipeline.append({"$project": projection})
+    return collection.aggregate(pipeline, maxTimeMS=max_time_ms)
@@ -0,0 +1,171 @@
+import os
+import re
+import logging
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+RANK_WEIGHT_SKILLS = float(os.getenv("RANK_WEIGHT_SKILLS", "0.4"))
+RANK_WEIGHT_EXPERIENCE = float(os.getenv("RANK_WEIGHT_EXPERIENCE", "0.3"))
+RANK_WEIGHT_ROLE = float(os.getenv("RANK_WEIGHT_ROLE", "0.2"))
+RANK_WEIGHT_RECENCY = float(os.getenv("RANK_WEIGHT_RECENCY", "0.1"))
+# Years that earn the full experience score when the question gives no threshold
+RANK_YEARS_TARGET = float(os.getenv("RANK_YEARS_TARGET", "10"))
+# A resume uploaded this many days ago gets half the recency score
+RANK_RECENCY_HALF_DAYS = float(os.getenv("RANK_RECENCY_HALF_DAYS", "90"))
+
+_MS_PER_DAY = 24 * 60 * 60 * 1000
+
+
+def _patterns(condition: Any) -> list[tuple[str, str]]:
+    """(regex, options) pairs a field condition asks for; negations and non-text conditions give none"""
+    if isinstance(condition, str):
+        return [("^" + re.escape(condition) + "$", "i")]
+    if not isinstance(condition, dict):
+        return []
+    if isinstance(condition.get("$regex"), str):
+        return [(condition["$regex"], condition.get("$options", ""))]
+    patterns = _patterns(condition.get("$eq"))
+    for operator in ("$in", "$all"):
+        for value in condition.get(operator) or []:
+            patterns += _patterns(value)
+    return patterns
+
+
+def _threshold(condition: Any) -> Optional[float]:
+    """Minimum years a years_experience condition asks for"""
+    if isinstance(condition, (int, float)) and not isinstance(condition, bool):
+        return float(condition)
+    if isinstance(condition, dict):
+        for operator in ("$gte", "$gt", "$eq"):
+            if isinstance(condition.get(operator), (int, float)):
+                return float(condition[operator])
+    return None
+
+
+def extract_criteria(query: dict) -> dict:
+    """
+    Skills and roles a validated chat query asks for, each as {"pattern", "options", "years"},
+    read from skills / roles_experience conditions anywhere under $and / $or. $nor is skipped.
+    """
+    criteria = {"skills": [], "roles": []}
+
+    def add(kind: str, condition: Any, years: Optional[float]) -> None:
+        for pattern, options in _patterns(condition):
+            criterion = {"pattern": pattern, "options": options, "years": years}
+            if criterion not in criteria[kind]:
+                criteria[kind].append(criterion)
+
+    def walk(node: Any) -> None:
+        if not isinstance(node, dict):
+            return
+        for key, value in node.items():
+            if key in ("$and", "$or"):
+                for item in value:
+                    walk(item)
+            elif key in ("skills", "roles_experience") and isinstance(value, dict) and isinstance(value.get("$elemMatch"), dict):
+                element = value["$elemMatch"]
+                field = "technology" if key == "skills" else "role"
+                add("skills" if key == "skills" else "roles", element.get(field), _threshold(element.get("years_experience")))
+            elif key == "skills.technology":
+                add("skills", value, None)
+            elif key in ("roles_experience.role", "current_role_experience.role", "current_role"):
+                add("roles", value, None)
+
+    walk(query)
+    return criteria
+
+
+def _matches(array: str, field: str, criterion: dict) -> dict:
+    """Per element of array: does element.field match the criterion"""
+    return {
+        "$map": {
+            "input": {"$ifNull": [array, []]},
+            "as": "item",
+            "in": {
+                "$regexMatch": {
+                    "input": {"$toString": {"$ifNull": [f"$$item.{field}", ""]}},
+                    "regex": criterion["pattern"],
+                    "options": criterion["options"],
+                }
+            },
+        }
+    }
+
+
+def _years(array: str, field: str, criterion: dict) -> dict:
+    """Most years of experience among the array elements matching the criterion, 0 when none does"""
+    return {
+        "$max": [
+            0,
+            {
+                "$max": {
+                    "$map": {
+                        "input": {"$ifNull": [array, []]},
+                        "as": "item",
+                        "in": {
+                            "$cond": [
+                                {
+                                    "$regexMatch": {
+                                        "input": {"$toString": {"$ifNull": [f"$$item.{field}", ""]}},
+                                        "regex": criterion["pattern"],
+                                        "options": criterion["options"],
+                                    }
+                                },
+                                {"$convert": {"input": "$$item.years_experience", "to": "double", "onError": 0, "onNull": 0}},
+                                0,
+                            ]
+                        },
+                    }
+                }
+            },
+        ]
+    }
+
+
+def _experience_score(array: str, field: str, criterion: dict) -> dict:
+    # Meeting the requested threshold earns half the score, twice the threshold all of it
+    target = 2 * criterion["years"] if criterion["years"] else RANK_YEARS_TARGET
+    return {"$divide": [{"$min": [_years(array, field, criterion), target]}, target]}
+
+
+def _mean(expressions: list) -> Any:
+    if not expressions:
+        return 0
+    return {"$divide": [{"$add": expressions}, len(expressions)]}
+
+
+def relevance_expression(criteria: dict) -> dict:
+    """Aggregation expression scoring a candidate between 0 and the sum of the weights"""
+    skills = [("$skills", "technology", criterion) for criterion in criteria["skills"]]
+    roles = [("$roles_experience", "role", criterion) for criterion in criteria["roles"]]
+
+    coverage = _mean([{"$cond": [{"$anyElementTrue": [_matches(*args)]}, 1, 0]} for args in skills])
+    role_match = _mean([{"$cond": [{"$anyElementTrue": [_matches(*args)]}, 1, 0]} for args in roles])
+    experience = _mean([_experience_score(*args) for args in skills + roles])
+    age_days = {"$divide": [{"$subtract": ["$$NOW", "$upload_timestamp"]}, _MS_PER_DAY]}
+    recency = {
+        "$cond": [
+            {"$eq": [{"$type": "$upload_timestamp"}, "date"]},
+            {"$divide": [RANK_RECENCY_HALF_DAYS, {"$add": [RANK_RECENCY_HALF_DAYS, {"$max": [age_days, 0]}]}]},
+            0,
+        ]
+    }
+    return {
+        "$add": [
+            {"$multiply": [RANK_WEIGHT_SKILLS, coverage]},
+            {"$multiply": [RANK_WEIGHT_EXPERIENCE, experience]},
+            {"$multiply": [RANK_WEIGHT_ROLE, role_match]},
+            {"$multiply": [RANK_WEIGHT_RECENCY, recency]},
+        ]
+    }
+
+
+def ranking_stages(query: dict) -> list:
+    """$addFields relevance and $sort stages ranking the candidates a validated query matches"""
+    criteria = extract_criteria(query)
+    logger.debug(f"Ranking on {len(criteria['skills'])} skills and {len(criteria['roles'])} roles")
+    return [
+        {"$addFields": {"relevance": relevance_expression(criteria)}},
+        {"$sort": {"relevance": -1, "upload_timestamp": -1, "_id": 1}},
+    ]
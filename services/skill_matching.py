@@ -9,7 +9,7 @@ except Exception:  # Fallback if json5 isn't installed
     import json as json5  # type: ignore
 import logging
 
-from embeddings.chroma_gemini_embedding import find_similar_skill as chroma_find_similar
+from embeddings.chroma_gemini_embedding import find_similar_skills as chroma_find_similar_batch
 
 
 logging.basicConfig(
@@ -43,22 +43,31 @@ class ChromaSimilarityStrategy(SkillMatchingStrategy):
         llm_client=None,
     ) -> Dict[str, Optional[str]]:
         mapping: Dict[str, Optional[str]] = {}
+        to_lookup: List[str] = []
         for skill in skills_cv:
             lower_skill = skill.strip().lower()
             if lower_skill in technologies_reference:
                 mapping[lower_skill] = lower_skill
-                continue
-            try:
-                similar = chroma_find_similar(lower_skill)
-                if isinstance(similar, str):
-                    normalized = similar.strip().lower()
-                    if normalized in technologies_reference:
-                        mapping[lower_skill] = normalized
-                        continue
-                mapping[lower_skill] = None
-            except Exception as e:
-                logger.warning(f"Chroma similarity failed for '{lower_skill}': {e}")
+            elif lower_skill not in mapping:
                 mapping[lower_skill] = None
+                to_lookup.append(lower_skill)
+
+        if not to_lookup:
+            return mapping
+
+        # One embedding request and one vector query for every unmatched skill
+        try:
+            similar_by_skill = chroma_find_similar_batch(to_lookup)
+        except Exception as e:
+            logger.warning(f"Chroma similarity failed for {to_lookup}: {e}")
+            return mapping
+
+        for lower_skill in to_lookup:
+            similar = similar_by_skill.get(lower_skill)
+            if isinstance(similar, str):
+                normalized = similar.strip().lower()
+                if normalized in technologies_reference:
+                    mapping[lower_skill] = normalized
         return mapping
 
 
@@ -1,5 +1,23 @@
 import re
+import os
+import io
+import hashlib
+import logging
+import multiprocessing
+import threading
+from datetime import date, datetime, time
+from concurrent.futures import ProcessPoolExecutor
 from langchain.document_loaders import PyPDFLoader
+from services.cache_service import DiskCache
+
+logger = logging.getLogger(__name__)
+
+PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+TEXT_CACHE_MAX_BYTES = int(os.getenv("TEXT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+_text_cache = None
 
 
 def clean_json(raw_text):
@@ -13,3 +31,74 @@ def extract_resume_text(pdf_file_path):
     loader = PyPDFLoader(pdf_file_path)
     pages = loader.load()
     return " ".join([page.page_content for page in pages])
+
+
+def as_date(value):
+    """Date part of a job_offer_date, whether stored as a BSON date or a legacy ISO string."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).date()
+        except ValueError:
+            return None
+    return None
+
+
+def as_datetime(value: date) -> datetime:
+    """Midnight of a date, since BSON only stores datetimes."""
+    return datetime.combine(value, time.min)
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 hex digest of raw file bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def normalized_text_hash(text: str) -> str:
+    """SHA-256 of the text lower-cased with whitespace collapsed, so re-exported PDFs with identical content match."""
+    normalized = re.sub(r"\s+", " ", text or "").strip().lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _extract_text_from_pdf_bytes(pdf_bytes: bytes) -> str:
+    # Runs in a worker process; pypdf is what PyPDFLoader uses under the hood
+    from pypdf import PdfReader
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    return " ".join([page.extract_text() or "" for page in reader.pages])
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            # spawn: the Streamlit server is multi-threaded, forking it is unsafe
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=PDF_EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pdf_pool
+
+
+def _get_text_cache() -> DiskCache:
+    global _text_cache
+    with _pdf_pool_lock:
+        if _text_cache is None:
+            _text_cache = DiskCache("resume_text", max_bytes=TEXT_CACHE_MAX_BYTES)
+        return _text_cache
+
+
+def extract_resume_text_from_bytes(pdf_bytes: bytes) -> str:
+    """Extract text from PDF bytes in the process pool, cached on disk by content hash."""
+    key = content_hash(pdf_bytes)
+    cache = _get_text_cache()
+    cached = cache.get(key)
+    if cached is not None:
+        logger.info(f"Text cache hit for {key[:12]}")
+        return cached.decode("utf-8")
+
+    text = _get_pdf_pool().submit(_extract_text_from_pdf_bytes, pdf_bytes).result()
+    cache.set(key, text.encode("utf-8"))
+    return text
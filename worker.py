@@ -0,0 +1,66 @@
+import argparse
+import logging
+import signal
+import threading
+
+from clients.mongo_client import mongo_candidat_init, collection_jobs
+from clients.mongo_indexes import ensure_indexes, JOB_INDEXES
+from clients.minio_client import MinioClientService
+from llms.ollamaClient import OllamaClient
+from llms.groqClient import GroqClient
+from llms.cachedClient import CachedLLMClient
+from llms.boundedClient import BoundedLLMClient
+from llms.routingClient import RoutingLLMClient
+from services.ingestion_service import DEFAULT_MAX_WORKERS, DEFAULT_MAX_LLM_CALLS
+from services.job_queue import new_worker_id, run_worker_loop, get_queue_counts
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(levelname)s] %(asctime)s - %(name)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drain the resume ingestion job queue")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="jobs processed at the same time")
+    parser.add_argument("--max-llm-calls", type=int, default=DEFAULT_MAX_LLM_CALLS, help="in-flight LLM requests per backend")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="seconds to wait when the queue is empty")
+    args = parser.parse_args()
+
+    ensure_indexes(collection_jobs, JOB_INDEXES)
+    groq, ollama = GroqClient(), OllamaClient()
+    llm_clients = {
+        "groq": BoundedLLMClient(CachedLLMClient(groq), max_in_flight=args.max_llm_calls),
+        "ollama": BoundedLLMClient(CachedLLMClient(ollama), max_in_flight=args.max_llm_calls),
+        "auto": BoundedLLMClient(CachedLLMClient(RoutingLLMClient([groq, ollama])), max_in_flight=args.max_llm_calls),
+    }
+    minio_client = MinioClientService()
+    collection = mongo_candidat_init()
+
+    stop_event = threading.Event()
+    # Finish the current steps on Ctrl+C / SIGTERM; unfinished jobs resume on the next run
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+
+    threads = []
+    for _ in range(max(1, args.workers)):
+        worker_id = new_worker_id()
+        thread = threading.Thread(
+            target=run_worker_loop,
+            args=(worker_id, llm_clients, minio_client, collection, stop_event, args.poll_interval),
+            name=worker_id,
+        )
+        thread.start()
+        threads.append(thread)
+
+    logger.info(f"Started {len(threads)} ingestion workers, queue: {get_queue_counts()}")
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=1.0)
+    logger.info("All ingestion workers stopped")
+
+
+if __name__ == "__main__":
+    # python worker.py --workers 4
+    main()